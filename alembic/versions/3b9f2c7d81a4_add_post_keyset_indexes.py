@@ -0,0 +1,34 @@
+"""Add post keyset pagination indexes and normalize created_at
+
+Revision ID: 3b9f2c7d81a4
+Revises: fea1c7902aaf
+Create Date: 2026-10-18 10:12:04.118230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9f2c7d81a4'
+down_revision: Union[str, None] = 'fea1c7902aaf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CURRENT_TIMESTAMP rows lack the fractional part SQLAlchemy writes, which
+    # breaks (created_at, id) comparisons between rows from the same second
+    op.execute("UPDATE post SET created_at = created_at || '.000000' WHERE length(created_at) = 19")
+    op.execute("UPDATE comments SET created_at = created_at || '.000000' WHERE length(created_at) = 19")
+    op.create_index('ix_post_created_at_post_id', 'post', ['created_at', 'post_id'], unique=False)
+    op.create_index('ix_post_user_id_created_at', 'post', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_post_user_id_created_at', table_name='post')
+    op.drop_index('ix_post_created_at_post_id', table_name='post')
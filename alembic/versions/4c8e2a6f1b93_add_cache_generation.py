@@ -0,0 +1,33 @@
+"""Add cache generation
+
+Revision ID: 4c8e2a6f1b93
+Revises: 9e3c5b7a1d26
+Create Date: 2026-10-18 22:05:43.281904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8e2a6f1b93'
+down_revision: Union[str, None] = '9e3c5b7a1d26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'cache_generation',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('generation', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('cache_generation')
@@ -0,0 +1,28 @@
+"""Add user avatar_variants
+
+Revision ID: 5d0b8e6f2c91
+Revises: c2e7a9143b5d
+Create Date: 2026-10-18 15:22:36.781044
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d0b8e6f2c91'
+down_revision: Union[str, None] = 'c2e7a9143b5d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('avatar_variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user', 'avatar_variants')
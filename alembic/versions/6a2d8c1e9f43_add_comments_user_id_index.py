@@ -0,0 +1,27 @@
+"""Add comments user_id index
+
+Revision ID: 6a2d8c1e9f43
+Revises: 0b9e4f7c3a58
+Create Date: 2026-10-18 18:37:09.460215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a2d8c1e9f43'
+down_revision: Union[str, None] = '0b9e4f7c3a58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_comments_user_id', 'comments', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_comments_user_id', table_name='comments')
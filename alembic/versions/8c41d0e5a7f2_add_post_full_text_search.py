@@ -0,0 +1,56 @@
+"""Add post full-text search
+
+Revision ID: 8c41d0e5a7f2
+Revises: 3b9f2c7d81a4
+Create Date: 2026-10-18 11:40:27.530915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c41d0e5a7f2'
+down_revision: Union[str, None] = '3b9f2c7d81a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE VIRTUAL TABLE post_fts USING fts5(
+            title, content, content='post', content_rowid='post_id',
+            tokenize='unicode61 remove_diacritics 2')
+    """)
+    op.execute("""
+        CREATE TRIGGER post_fts_ai AFTER INSERT ON post BEGIN
+            INSERT INTO post_fts(rowid, title, content)
+            VALUES (new.post_id, new.title, new.content);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER post_fts_ad AFTER DELETE ON post BEGIN
+            INSERT INTO post_fts(post_fts, rowid, title, content)
+            VALUES ('delete', old.post_id, old.title, old.content);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER post_fts_au AFTER UPDATE OF title, content ON post BEGIN
+            INSERT INTO post_fts(post_fts, rowid, title, content)
+            VALUES ('delete', old.post_id, old.title, old.content);
+            INSERT INTO post_fts(rowid, title, content)
+            VALUES (new.post_id, new.title, new.content);
+        END
+    """)
+    op.execute("INSERT INTO post_fts(post_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS post_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS post_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS post_fts_ai")
+    op.execute("DROP TABLE IF EXISTS post_fts")
@@ -0,0 +1,30 @@
+"""Add user purge claim
+
+Revision ID: 9e3c5b7a1d26
+Revises: d4f1a6b2e870
+Create Date: 2026-10-18 20:41:07.532119
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e3c5b7a1d26'
+down_revision: Union[str, None] = 'd4f1a6b2e870'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('purge_owner', sa.String(), nullable=True))
+    op.add_column('user', sa.Column('purge_lease', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user', 'purge_lease')
+    op.drop_column('user', 'purge_owner')
@@ -0,0 +1,32 @@
+"""Add post and comment updated_at
+
+Revision ID: a7f3c5e1d094
+Revises: 5d0b8e6f2c91
+Create Date: 2026-10-18 16:04:12.318527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7f3c5e1d094'
+down_revision: Union[str, None] = '5d0b8e6f2c91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('post', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.add_column('comments', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE post SET updated_at = created_at")
+    op.execute("UPDATE comments SET updated_at = created_at")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('comments', 'updated_at')
+    op.drop_column('post', 'updated_at')
@@ -0,0 +1,28 @@
+"""Add user updated_at
+
+Revision ID: b5d9e3f7a204
+Revises: 4c8e2a6f1b93
+Create Date: 2026-10-18 22:31:16.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d9e3f7a204'
+down_revision: Union[str, None] = '4c8e2a6f1b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user', 'updated_at')
@@ -0,0 +1,34 @@
+"""Add post comment_count and comments pagination index
+
+Revision ID: c2e7a9143b5d
+Revises: 8c41d0e5a7f2
+Create Date: 2026-10-18 13:05:51.204417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e7a9143b5d'
+down_revision: Union[str, None] = '8c41d0e5a7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('post', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_comments_post_id_created_at', 'comments', ['post_id', 'created_at'], unique=False)
+    op.execute("""
+        UPDATE post SET comment_count = (
+            SELECT count(*) FROM comments WHERE comments.post_id = post.post_id)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_comments_post_id_created_at', table_name='comments')
+    op.drop_column('post', 'comment_count')
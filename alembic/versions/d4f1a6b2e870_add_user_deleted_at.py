@@ -0,0 +1,28 @@
+"""Add user deleted_at
+
+Revision ID: d4f1a6b2e870
+Revises: 6a2d8c1e9f43
+Create Date: 2026-10-18 19:12:44.108532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f1a6b2e870'
+down_revision: Union[str, None] = '6a2d8c1e9f43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user', 'deleted_at')
@@ -0,0 +1,83 @@
+"""Add post excerpt, word_count and reading_time
+
+Revision ID: e1b6d4a09c37
+Revises: a7f3c5e1d094
+Create Date: 2026-10-18 16:41:55.902113
+
+"""
+import math
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1b6d4a09c37'
+down_revision: Union[str, None] = 'a7f3c5e1d094'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# frozen copy of excerpts.summarize as of this revision
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
+BATCH_SIZE = 500
+
+
+def summarize(text: str) -> dict:
+    word_count = len(text.split())
+    excerpt = re.sub(r"\s+", " ", text).strip()
+    if len(excerpt) > EXCERPT_LENGTH:
+        cut = excerpt[:EXCERPT_LENGTH]
+        space = cut.rfind(" ")
+        if space > EXCERPT_LENGTH // 2:
+            cut = cut[:space]
+        excerpt = cut.rstrip(" .,;:") + "…"
+    return {
+        "excerpt": excerpt,
+        "word_count": word_count,
+        "reading_time": max(1, math.ceil(word_count / WORDS_PER_MINUTE)) if word_count else 0,
+    }
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('post', sa.Column('excerpt', sa.String(), server_default='', nullable=False))
+    op.add_column('post', sa.Column('word_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('post', sa.Column('reading_time', sa.Integer(), server_default='0', nullable=False))
+
+    connection = op.get_bind()
+    post = sa.table(
+        'post',
+        sa.column('post_id', sa.Integer()),
+        sa.column('content', sa.Text()),
+        sa.column('excerpt', sa.String()),
+        sa.column('word_count', sa.Integer()),
+        sa.column('reading_time', sa.Integer()),
+    )
+    update = (
+        post.update()
+        .where(post.c.post_id == sa.bindparam('b_post_id'))
+        .values(excerpt=sa.bindparam('excerpt'),
+                word_count=sa.bindparam('word_count'),
+                reading_time=sa.bindparam('reading_time')))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(post.c.post_id, post.c.content)
+            .where(post.c.post_id > last_id)
+            .order_by(post.c.post_id)
+            .limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        connection.execute(update, [
+            {"b_post_id": row.post_id, **summarize(row.content or "")} for row in rows])
+        last_id = rows[-1].post_id
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('post', 'reading_time')
+    op.drop_column('post', 'word_count')
+    op.drop_column('post', 'excerpt')
@@ -0,0 +1,32 @@
+"""Add post content_html and render_version
+
+Revision ID: f08c2d5b7a16
+Revises: e1b6d4a09c37
+Create Date: 2026-10-18 17:12:40.551276
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f08c2d5b7a16'
+down_revision: Union[str, None] = 'e1b6d4a09c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing posts keep render_version 0 and are rendered on first read or
+    # in bulk with app/rerender_posts.py
+    op.add_column('post', sa.Column('content_html', sa.Text(), nullable=True))
+    op.add_column('post', sa.Column('render_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('post', 'render_version')
+    op.drop_column('post', 'content_html')
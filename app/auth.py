@@ -1,40 +1,63 @@
+from typing import Optional
 from fastapi import HTTPException, Request, Depends
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, or_
 from sqlalchemy.future import select
+from cache import principal_cache
 from models import User
-from typing import Optional
+from schemas import Principal
+from security import dummy_verify, verify_and_update_password
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+async def find_login_user(identifier: str, db: AsyncSession) -> Optional[User]:
+    # both columns are uniquely indexed, so this is two index probes; an
+    # email match wins if the identifier is also someone's username
+    result = await db.execute(
+        select(User)
+        .where(or_(User.email == identifier, User.username == identifier),
+               User.deleted_at.is_(None))
+        .order_by(case((User.email == identifier, 0), else_=1))
+        .limit(1))
+    return result.scalars().first()
 
-async def authenticate_user(identifier: str, password: str, db: AsyncSession) -> User:
-    result = await db.execute(select(User).filter(User.email == identifier))
-    user = result.scalars().first()
-
-    if user is None:
-        result = await db.execute(select(User).filter(User.username == identifier))
-        user = result.scalars().first()
 
+async def verify_login(user: Optional[User], password: str, db: AsyncSession) -> User:
     if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
+        await dummy_verify(password)
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
 
-    if not pwd_context.verify(password, user.hashed_password):
-        raise HTTPException(status_code=401, detail="Incorrect password")
+    verified, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not verified:
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
 
     return user
 
 
-async def get_current_user(request: Request, db: AsyncSession) -> Optional[User]:
+async def authenticate_user(identifier: str, password: str, db: AsyncSession) -> User:
+    return await verify_login(await find_login_user(identifier, db), password, db)
+
+
+async def get_current_user(request: Request, db: AsyncSession) -> Principal:
     user_id = request.session.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    user = await db.get(User, user_id)
-    if not user:
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+    result = await db.execute(
+        select(User.user_id, User.username, User.role, User.avatar_url, User.avatar_variants)
+        .where(User.user_id == user_id, User.deleted_at.is_(None)))
+    row = result.first()
+    if not row:
         raise HTTPException(status_code=401, detail="Invalid user")
-    return user
+    principal = Principal.model_validate(row)
+    principal_cache.set(user_id, principal)
+    return principal
 
 
-async def check_admin(user: User) -> None:
+async def check_admin(user: Principal) -> None:
     if user.role != "admin":
         raise HTTPException(status_code=403, detail="Access denied")
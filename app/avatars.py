@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, List, Optional, Tuple
+from fastapi import HTTPException, UploadFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+from starlette.concurrency import run_in_threadpool
+from config import AVATAR_CHUNK_SIZE, AVATAR_MAX_BYTES, AVATAR_WORKERS
+
+AVATAR_DIR = "static/avatars"
+AVATAR_URL_PREFIX = "/static/avatars/"
+DEFAULT_AVATAR_URL = "/static/avatars/default.png"
+AVATAR_SIZES = (32, 64, 256)
+
+_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def sniff_image_type(header: bytes) -> Optional[str]:
+    for signature, ext in _SIGNATURES:
+        if header.startswith(signature):
+            return ext
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=AVATAR_WORKERS)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# (temporary path, final path) pairs; files stay under their temporary names
+# until publish_avatar moves them into place
+AvatarFiles = List[Tuple[str, str]]
+
+
+def _stage_variant(image: Image.Image, path: str, **options) -> Tuple[str, str]:
+    fd, temp_path = tempfile.mkstemp(dir=AVATAR_DIR, prefix=".variant-")
+    with os.fdopen(fd, "wb") as buffer:
+        image.save(buffer, **options)
+    return temp_path, path
+
+
+def build_avatar(upload_path: str, digest: str, ext: str) -> Tuple[dict, AvatarFiles]:
+    # runs in a worker process; nothing is written under a final name here, so
+    # a concurrent release of the same hash can't delete files before they are
+    # referenced
+    try:
+        with Image.open(upload_path) as source:
+            source.load()
+            image = ImageOps.exif_transpose(source)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+        raise ValueError("Unreadable image") from exc
+
+    has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    fallback_ext, fallback_format = (".png", "PNG") if has_alpha else (".jpg", "JPEG")
+
+    variants = {}
+    files = []
+    try:
+        for size in AVATAR_SIZES:
+            resized = ImageOps.fit(image, (size, size), Image.LANCZOS)
+            webp_name = f"{digest}-{size}.webp"
+            fallback_name = f"{digest}-{size}{fallback_ext}"
+            files.append(_stage_variant(resized, os.path.join(AVATAR_DIR, webp_name),
+                                        format="WEBP", quality=80, method=4))
+            files.append(_stage_variant(resized, os.path.join(AVATAR_DIR, fallback_name),
+                                        format=fallback_format, optimize=True,
+                                        **({} if has_alpha else {"quality": 85})))
+            variants[str(size)] = {
+                "webp": f"{AVATAR_URL_PREFIX}{webp_name}",
+                "fallback": f"{AVATAR_URL_PREFIX}{fallback_name}",
+            }
+    except BaseException:
+        _remove_files([temp_path for temp_path, _ in files])
+        raise
+
+    original_name = f"{digest}{ext}"
+    files.append((upload_path, os.path.join(AVATAR_DIR, original_name)))
+    avatar = {"avatar_url": f"{AVATAR_URL_PREFIX}{original_name}", "avatar_variants": variants}
+    return avatar, files
+
+
+def _close(buffer: BinaryIO) -> None:
+    buffer.flush()
+    os.fsync(buffer.fileno())
+    buffer.close()
+
+
+def _discard(buffer: BinaryIO, temp_path: str) -> None:
+    buffer.close()
+    try:
+        os.unlink(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+async def save_avatar(upload: Optional[UploadFile]) -> Tuple[Optional[dict], AvatarFiles]:
+    if upload is None or not upload.filename:
+        return None, []
+    if upload.size is not None and upload.size > AVATAR_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Avatar file is too large")
+    fd, temp_path = await run_in_threadpool(
+        tempfile.mkstemp, dir=AVATAR_DIR, prefix=".upload-")
+    buffer = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+    try:
+        ext = None
+        written = 0
+        while chunk := await upload.read(AVATAR_CHUNK_SIZE):
+            if ext is None:
+                ext = sniff_image_type(chunk)
+                if ext is None:
+                    raise HTTPException(
+                        status_code=400, detail="Only image files are allowed")
+            written += len(chunk)
+            if written > AVATAR_MAX_BYTES:
+                raise HTTPException(
+                    status_code=413, detail="Avatar file is too large")
+            digest.update(chunk)
+            await run_in_threadpool(buffer.write, chunk)
+        if ext is None:
+            raise HTTPException(status_code=400, detail="Only image files are allowed")
+        await run_in_threadpool(_close, buffer)
+    except BaseException:
+        await run_in_threadpool(_discard, buffer, temp_path)
+        raise
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            _get_executor(), build_avatar, temp_path, digest.hexdigest()[:32], ext)
+    except ValueError:
+        await run_in_threadpool(_remove_files, [temp_path])
+        raise HTTPException(status_code=400, detail="Only image files are allowed")
+    except BaseException:
+        await run_in_threadpool(_remove_files, [temp_path])
+        raise
+
+
+def avatar_paths(avatar_url: Optional[str], avatar_variants: Optional[dict] = None) -> list:
+    urls = [avatar_url]
+    for variant in (avatar_variants or {}).values():
+        urls.extend(variant.values())
+    return [
+        os.path.join(AVATAR_DIR, os.path.basename(url))
+        for url in urls
+        if url and url != DEFAULT_AVATAR_URL and url.startswith(AVATAR_URL_PREFIX)
+    ]
+
+
+def _remove_files(paths: list) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+async def remove_avatar(avatar_url: Optional[str], avatar_variants: Optional[dict] = None) -> None:
+    paths = avatar_paths(avatar_url, avatar_variants)
+    if paths:
+        await run_in_threadpool(_remove_files, paths)
+
+
+def _publish(files: AvatarFiles) -> None:
+    # always replaces rather than trusting a file already under the final name;
+    # callers hold the database write lock, so no release can run in between
+    for temp_path, final_path in files:
+        os.replace(temp_path, final_path)
+
+
+async def publish_avatar(files: AvatarFiles) -> None:
+    if files:
+        await run_in_threadpool(_publish, files)
+
+
+async def discard_avatar(files: AvatarFiles) -> None:
+    # published files are gone from their temporary names, so this is a no-op for them
+    if files:
+        await run_in_threadpool(_remove_files, [temp_path for temp_path, _ in files])
@@ -0,0 +1,100 @@
+"""Fingerprint and precompress the static tree.
+
+Copies every asset under static/ to static/dist/<name>.<hash>.<ext>, writes
+gzip and brotli siblings for compressible types and records the mapping in
+static/dist/manifest.json for static_url() and CachedStaticFiles.
+
+    python build_static.py
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from static_files import MANIFEST_PATH, STATIC_DIR, fingerprint
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+COMPRESSIBLE = {".css", ".js", ".mjs", ".svg", ".html", ".txt", ".json", ".xml", ".ico", ".map", ".woff", ".ttf"}
+SKIP_DIRS = {"dist"}
+
+
+def iter_assets(root: str):
+    for directory, subdirs, files in os.walk(root):
+        if os.path.samefile(directory, root):
+            subdirs[:] = [d for d in subdirs if d not in SKIP_DIRS]
+        for name in sorted(files):
+            # dotfiles, compressed siblings and already content-named files such as uploads
+            if name.startswith(".") or name.endswith((".gz", ".br")) or fingerprint(name):
+                continue
+            yield os.path.relpath(os.path.join(directory, name), root).replace(os.sep, "/")
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def precompress(path: str, min_size: int) -> list:
+    with open(path, "rb") as source:
+        data = source.read()
+    if len(data) < min_size:
+        return []
+    encodings = []
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(compressed) < len(data):
+        with open(f"{path}.gz", "wb") as target:
+            target.write(compressed)
+        encodings.append("gzip")
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(f"{path}.br", "wb") as target:
+                target.write(compressed)
+            encodings.insert(0, "br")
+    return encodings
+
+
+def build(root: str = STATIC_DIR, min_size: int = 256) -> dict:
+    manifest = {"assets": {}, "etags": {}, "encodings": {}}
+    for relative in iter_assets(root):
+        source = os.path.join(root, relative)
+        digest = file_digest(source)
+        stem, ext = os.path.splitext(relative)
+        target_relative = f"dist/{stem}.{digest[:12]}{ext}"
+        target = os.path.join(root, target_relative)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if not os.path.exists(target):
+            shutil.copy2(source, target)
+        manifest["assets"][relative] = target_relative
+        manifest["etags"][target_relative] = digest[:32]
+        if os.path.splitext(relative)[1].lower() in COMPRESSIBLE:
+            encodings = precompress(os.path.join(root, target_relative), min_size)
+            if encodings:
+                manifest["encodings"][target_relative] = encodings
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--min-size", type=int, default=256,
+                        help="skip precompressing files smaller than this many bytes")
+    args = parser.parse_args()
+    manifest = build(min_size=args.min_size)
+    os.makedirs(DIST_DIR, exist_ok=True)
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as target:
+        json.dump(manifest, target, indent=2, sort_keys=True)
+    print(f"{len(manifest['assets'])} assets fingerprinted, "
+          f"{len(manifest['encodings'])} precompressed -> {MANIFEST_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from config import FEED_CACHE_SIZE, PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL
+from models import CacheGeneration
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import time
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return None
+        return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def items(self) -> list:
+        return list(self._data.items())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.ttl = ttl
+        self._entries = LRUCache(maxsize)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl > 0:
+            self._entries.set(key, (time.monotonic() + self.ttl, value))
+
+    def pop(self, key: Hashable) -> None:
+        self._entries.pop(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class GenerationCache:
+    """LRU cache whose entries are only valid for the generation they were read in.
+
+    The generation is a row in the database, so a write in any worker process
+    invalidates every process's entries. Writers call ``bump`` inside the
+    write's transaction; readers call ``current`` before loading and store
+    the result under that generation, so a result read before a bump is
+    dropped instead of served.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        # the newest generation this process has seen
+        self.generation = 0
+        self._entries = LRUCache(maxsize)
+
+    async def current(self, db: AsyncSession) -> int:
+        generation = await db.scalar(
+            select(CacheGeneration.generation).where(CacheGeneration.name == self.name)) or 0
+        if generation > self.generation:
+            self.generation = generation
+            self._entries.clear()
+        return generation
+
+    def get(self, key: Hashable, generation: int) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored, value = entry
+        if stored != generation:
+            self._entries.pop(key)
+            return None
+        return value
+
+    def set(self, key: Hashable, value: Any, generation: int) -> None:
+        if generation == self.generation:
+            self._entries.set(key, (generation, value))
+
+    async def bump(self, db: AsyncSession) -> None:
+        await db.execute(
+            insert(CacheGeneration)
+            .values(name=self.name, generation=1)
+            .on_conflict_do_update(
+                index_elements=[CacheGeneration.name],
+                set_={"generation": CacheGeneration.generation + 1}))
+        self._entries.clear()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+feed_cache = GenerationCache("feed", FEED_CACHE_SIZE)
+principal_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
@@ -0,0 +1,50 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request
+from starlette.responses import Response
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(
+        "|".join(str(part) for part in parts).encode(), digest_size=12).hexdigest()
+    # weak: the rendered bytes can differ with content encoding
+    return f'W/"{digest}"'
+
+
+def _opaque(tag: str) -> str:
+    return tag.strip().removeprefix("W/")
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {_opaque(tag) for tag in if_none_match.split(",")}
+        return "*" in tags or _opaque(etag) in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {
+        "etag": etag,
+        "cache-control": "private, no-cache",
+        "vary": "Cookie",
+    }
+    if last_modified is not None:
+        headers["last-modified"] = format_datetime(
+            last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+
+def not_modified_response(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -3,7 +3,84 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-DATABASE_URL = "sqlite+aiosqlite:///../test.db"
+
+def env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///../test.db")
+DB_ECHO = env_bool("DB_ECHO")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+DB_AUTO_UPGRADE = env_bool("DB_AUTO_UPGRADE")
+# statements slower than this are logged by the slow_query logger
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# negative values are KiB, so this is a 64 MiB page cache per connection
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+FEED_CACHE_SIZE = int(os.getenv("FEED_CACHE_SIZE", "256"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "4096"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+AVATAR_MAX_BYTES = int(os.getenv("AVATAR_MAX_BYTES", str(5 * 1024 * 1024)))
+AVATAR_CHUNK_SIZE = int(os.getenv("AVATAR_CHUNK_SIZE", str(64 * 1024)))
+AVATAR_WORKERS = int(os.getenv("AVATAR_WORKERS", "2"))
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# re-check template files for changes on every render; only for development
+TEMPLATE_AUTO_RELOAD = env_bool("TEMPLATE_AUTO_RELOAD")
+# where compiled template bytecode is kept; defaults to the system temp dir
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR")
+# streamed pages are flushed whenever this much HTML has been rendered
+TEMPLATE_STREAM_CHUNK_SIZE = int(os.getenv("TEMPLATE_STREAM_CHUNK_SIZE", str(16 * 1024)))
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "512"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+# brotli 4-5 is close to gzip -9 in size at a fraction of the CPU of 11
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# "memory" keeps sessions in this process only; use "sqlite" with several workers
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_COOKIE_NAME = os.getenv("SESSION_COOKIE_NAME", "session")
+SESSION_MAX_AGE = int(os.getenv("SESSION_MAX_AGE", str(14 * 24 * 3600)))
+SESSION_HTTPS_ONLY = env_bool("SESSION_HTTPS_ONLY")
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_PURGE_INTERVAL = float(os.getenv("SESSION_PURGE_INTERVAL", "300"))
+
+# per client address: a burst of LOGIN_IP_BURST, refilled at LOGIN_IP_PER_MINUTE
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "10"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "10"))
+# per account: at most LOGIN_ACCOUNT_ATTEMPTS within LOGIN_ACCOUNT_WINDOW seconds
+LOGIN_ACCOUNT_ATTEMPTS = int(os.getenv("LOGIN_ACCOUNT_ATTEMPTS", "10"))
+LOGIN_ACCOUNT_WINDOW = float(os.getenv("LOGIN_ACCOUNT_WINDOW", "300"))
+LOGIN_MAX_PENDING = int(os.getenv("LOGIN_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+RATE_LIMIT_KEYS = int(os.getenv("RATE_LIMIT_KEYS", "100000"))
+
+# accounts with more posts and comments than this are soft-deleted and purged
+# in the background, PURGE_CHUNK_SIZE rows per transaction
+PURGE_INLINE_LIMIT = int(os.getenv("PURGE_INLINE_LIMIT", "1000"))
+PURGE_CHUNK_SIZE = int(os.getenv("PURGE_CHUNK_SIZE", "500"))
+# pause between chunks so request writes get the database lock in between
+PURGE_PAUSE = float(os.getenv("PURGE_PAUSE", "0.05"))
+# seconds a worker's claim on a purge lasts without progress before another
+# worker may take the account over
+PURGE_LEASE = float(os.getenv("PURGE_LEASE", "300"))
+
+# when set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 
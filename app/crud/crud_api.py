@@ -0,0 +1,147 @@
+from fastapi import HTTPException
+from crud.crud_post import refresh_rendered
+from models import Comment, Post, User
+from pagination import build_page, decode_cursor, keyset_query
+from rendering import RENDERER_VERSION
+from schemas import ApiComment, ApiPage, ApiPost, ApiPostSummary, ApiProfile
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+from typing import Optional
+
+# column projections for the JSON API: no ORM entities are loaded and the
+# author is reduced to what a client needs to render a byline
+_AUTHOR_COLUMNS = (
+    User.user_id.label("author_id"),
+    User.username.label("author_username"),
+    User.avatar_url.label("author_avatar_url"),
+)
+_POST_SUMMARY_COLUMNS = (
+    Post.post_id, Post.title, Post.excerpt, Post.word_count, Post.reading_time,
+    Post.created_at, Post.updated_at, Post.comment_count, *_AUTHOR_COLUMNS,
+)
+_COMMENT_COLUMNS = (
+    Comment.comment_id, Comment.post_id, Comment.content, Comment.created_at,
+    Comment.updated_at, *_AUTHOR_COLUMNS,
+)
+
+
+def _author(row) -> dict:
+    return {
+        "user_id": row.author_id,
+        "username": row.author_username,
+        "avatar_url": row.author_avatar_url,
+    }
+
+
+def _post_summary(row) -> ApiPostSummary:
+    return {
+        "post_id": row.post_id,
+        "title": row.title,
+        "excerpt": row.excerpt,
+        "word_count": row.word_count,
+        "reading_time": row.reading_time,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "comment_count": row.comment_count,
+        "author": _author(row),
+    }
+
+
+def _comment_item(row) -> ApiComment:
+    return {
+        "comment_id": row.comment_id,
+        "post_id": row.post_id,
+        "content": row.content,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "author": _author(row),
+    }
+
+
+async def read_post_items(
+        db: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None) -> ApiPage[ApiPostSummary]:
+    page_cursor = decode_cursor(cursor)
+    query = (
+        select(*_POST_SUMMARY_COLUMNS)
+        .join(User, User.user_id == Post.user_id)
+        .where(User.deleted_at.is_(None)))
+    if user_id is not None:
+        query = query.where(Post.user_id == user_id)
+    query = keyset_query(
+        query, (Post.created_at, Post.post_id), page_cursor, limit)
+    result = await db.execute(query)
+    rows, next_cursor, prev_cursor = build_page(
+        result.all(), page_cursor, limit,
+        key=lambda row: (row.created_at, row.post_id))
+    return {
+        "items": [_post_summary(row) for row in rows],
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
+
+
+async def read_post_item(post_id: int, db: AsyncSession) -> ApiPost:
+    result = await db.execute(
+        select(*_POST_SUMMARY_COLUMNS, Post.content, Post.content_html, Post.render_version)
+        .join(User, User.user_id == Post.user_id)
+        .where(Post.post_id == post_id, User.deleted_at.is_(None)))
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    item = {**_post_summary(row), "content": row.content, "content_html": row.content_html}
+    if row.render_version != RENDERER_VERSION:
+        rendered = await refresh_rendered(row.post_id, row.content, db)
+        item.update((name, rendered[name]) for name in (
+            "content_html", "excerpt", "word_count", "reading_time"))
+    return item
+
+
+async def read_comment_items(
+        post_id: int,
+        db: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None) -> ApiPage[ApiComment]:
+    page_cursor = decode_cursor(cursor)
+    # neither the post's author nor the commenter may be awaiting their purge
+    post_author = aliased(User)
+    live_post = (
+        select(Post.post_id)
+        .join(post_author, post_author.user_id == Post.user_id)
+        .where(Post.post_id == post_id, post_author.deleted_at.is_(None)))
+    query = keyset_query(
+        select(*_COMMENT_COLUMNS)
+        .join(User, User.user_id == Comment.user_id)
+        .where(Comment.post_id.in_(live_post), User.deleted_at.is_(None)),
+        (Comment.created_at, Comment.comment_id), page_cursor, limit, descending=False)
+    result = await db.execute(query)
+    rows, next_cursor, prev_cursor = build_page(
+        result.all(), page_cursor, limit,
+        key=lambda row: (row.created_at, row.comment_id))
+    if not rows and page_cursor is None:
+        exists = await db.scalar(live_post)
+        if exists is None:
+            raise HTTPException(status_code=404, detail="Post not found")
+    return {
+        "items": [_comment_item(row) for row in rows],
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+    }
+
+
+async def read_profile_item(user_id: int, db: AsyncSession) -> ApiProfile:
+    post_count = (
+        select(func.count(Post.post_id))
+        .where(Post.user_id == User.user_id)
+        .scalar_subquery())
+    result = await db.execute(
+        select(User.user_id, User.username, User.gender, User.avatar_url,
+               User.avatar_variants, post_count.label("post_count"))
+        .where(User.user_id == user_id, User.deleted_at.is_(None)))
+    row = result.mappings().first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return dict(row)
@@ -1,9 +1,16 @@
 from fastapi import HTTPException
-from models import Comment
-from schemas import CommentCreate, CommentRead, CommentUpdate
+from cache import feed_cache
+from models import Comment, Post, User, utcnow
+from pagination import PageStream, build_page, decode_cursor, keyset_query, page_cursors
+from schemas import CommentCreate, CommentRead, CommentUpdate, Page
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy import select
+from sqlalchemy.orm import selectinload, sessionmaker
+from sqlalchemy import func, select, update
+from typing import Iterable, Optional
+
+# streamed threads are fetched, and their authors loaded, this many rows at a
+# time, so the first comments are sent before the rest of the page is read
+_STREAM_CHUNK_SIZE = 10
 
 
 async def get_user_by_comment(comment_id: int, db: AsyncSession) -> int | None:
@@ -17,26 +24,108 @@ async def create_comment(
         user_id: int,
         comment_create: CommentCreate,
         db: AsyncSession) -> Comment:
+    # the count update doubles as the check that the post exists
+    result = await db.execute(
+        update(Post)
+        .where(Post.post_id == post_id)
+        .values(comment_count=Post.comment_count + 1))
+    if result.rowcount == 0:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Post not found")
     comment = Comment(
         post_id=post_id,
         user_id=user_id,
         content=comment_create.content)
     db.add(comment)
+    await feed_cache.bump(db)
     await db.commit()
     await db.refresh(comment)
     return comment
 
 
-async def get_comments_by_post(post_id: int, db: AsyncSession) -> list[CommentRead]:
-    query = (
+async def get_comments_by_post(
+        post_id: int,
+        db: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: int = 50) -> Page[CommentRead]:
+    page_cursor = decode_cursor(cursor)
+    query = keyset_query(
         select(Comment)
+        .join(User, User.user_id == Comment.user_id)
         .options(selectinload(Comment.user))
-        .where(Comment.post_id == post_id)
-        .order_by(Comment.created_at.asc())
-    )
+        .where(Comment.post_id == post_id, User.deleted_at.is_(None)),
+        (Comment.created_at, Comment.comment_id), page_cursor, limit, descending=False)
     result = await db.execute(query)
-    comments = result.scalars().all()
-    return [CommentRead.model_validate(comment) for comment in comments]
+    comments, next_cursor, prev_cursor = build_page(
+        result.scalars().all(), page_cursor, limit,
+        key=lambda comment: (comment.created_at, comment.comment_id))
+    return Page[CommentRead](
+        items=[CommentRead.model_validate(comment) for comment in comments],
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor)
+
+
+def stream_comments_by_post(
+        post_id: int,
+        session_factory: sessionmaker,
+        cursor: Optional[str] = None,
+        limit: int = 50) -> PageStream:
+    # the cursor is checked and the query built now, so a bad cursor is a 400
+    # before the response starts
+    page_cursor = decode_cursor(cursor)
+    query = keyset_query(
+        select(Comment)
+        .join(User, User.user_id == Comment.user_id)
+        .options(selectinload(Comment.user))
+        .where(Comment.post_id == post_id, User.deleted_at.is_(None)),
+        (Comment.created_at, Comment.comment_id), page_cursor, limit, descending=False)
+
+    def key(comment):
+        return (comment.created_at, comment.comment_id)
+
+    async def items(page: PageStream):
+        # runs while the response is being sent, after the request's own
+        # session has been closed
+        async with session_factory() as db:
+            if page_cursor is not None and page_cursor.direction == "prev":
+                # rows arrive newest first; the page is bounded, so reverse it in memory
+                result = await db.execute(query)
+                comments, page.next_cursor, page.prev_cursor = build_page(
+                    result.scalars().all(), page_cursor, limit, key)
+                for comment in comments:
+                    yield comment
+                return
+            # without yield_per the ORM buffers the whole result before the first row
+            result = await db.stream_scalars(
+                query.execution_options(yield_per=_STREAM_CHUNK_SIZE))
+            first = last = None
+            count = 0
+            has_more = False
+            async for comment in result:
+                if count == limit:
+                    has_more = True
+                    break
+                first = first or comment
+                last = comment
+                count += 1
+                yield comment
+            if count:
+                page.next_cursor, page.prev_cursor = page_cursors(
+                    first, last, page_cursor, has_more, key)
+
+    return PageStream(items)
+
+
+async def recount_comments(post_ids: Iterable[int], db: AsyncSession) -> None:
+    post_ids = list(post_ids)
+    if not post_ids:
+        return
+    await db.execute(
+        update(Post)
+        .where(Post.post_id.in_(post_ids))
+        .values(comment_count=select(func.count(Comment.comment_id))
+                .where(Comment.post_id == Post.post_id)
+                .scalar_subquery()))
 
 
 async def update_comment(
@@ -49,6 +138,10 @@ async def update_comment(
         return None
     if comment_update.content is not None:
         comment.content = comment_update.content
+    await db.execute(
+        update(Post)
+        .where(Post.post_id == comment.post_id)
+        .values(updated_at=utcnow()))
     await db.commit()
     await db.refresh(comment)
     return comment
@@ -58,4 +151,9 @@ async def delete_comment(comment_id: int, db: AsyncSession) -> Comment:
     result = await db.execute(select(Comment).where(Comment.comment_id == comment_id))
     comment = result.scalars().first()
     await db.delete(comment)
+    await db.execute(
+        update(Post)
+        .where(Post.post_id == comment.post_id)
+        .values(comment_count=Post.comment_count - 1))
+    await feed_cache.bump(db)
     await db.commit()
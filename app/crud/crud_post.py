@@ -1,10 +1,36 @@
 from fastapi import HTTPException
-from models import Post
-from schemas import PostCreate, PostRead, PostUpdate
+from markupsafe import escape
+from cache import feed_cache
+from rendering import RENDERER_VERSION, render_post
+from models import Post, User
+from pagination import build_page, decode_cursor, keyset_query
+from schemas import Page, PostCreate, PostRead, PostSearchHit, PostSummary, PostUpdate, SearchPage
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy import select
-from typing import List, Optional
+from sqlalchemy.orm import defer, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import DateTime, delete, select, text, update
+from datetime import datetime
+from typing import Optional
+import re
+
+# FTS5 wraps matches in these markers; they are swapped for <mark> after the
+# rest of the text has been HTML-escaped
+_MATCH_START = "\x02"
+_MATCH_END = "\x03"
+_MAX_SEARCH_TERMS = 16
+
+_SEARCH_SQL = text(f"""
+    SELECT post.post_id, post.created_at, user.user_id, user.username,
+           highlight(post_fts, 0, '{_MATCH_START}', '{_MATCH_END}') AS title_html,
+           snippet(post_fts, 1, '{_MATCH_START}', '{_MATCH_END}', '…', 32) AS snippet_html,
+           bm25(post_fts, 10.0, 1.0) AS rank
+    FROM post_fts
+    JOIN post ON post.post_id = post_fts.rowid
+    JOIN user ON user.user_id = post.user_id
+    WHERE post_fts MATCH :match AND user.deleted_at IS NULL
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+""").columns(created_at=DateTime)
 
 
 async def get_post_by_id(post_id: int, db: AsyncSession) -> Post:
@@ -13,17 +39,51 @@ async def get_post_by_id(post_id: int, db: AsyncSession) -> Post:
         .options(selectinload(Post.user))
         .where(Post.post_id == post_id))
     post = result.scalar_one_or_none()
-    if not post:
+    # posts of an account awaiting its purge are already gone for readers
+    if not post or post.user.deleted_at is not None:
         raise HTTPException(status_code=404, detail="Post not found")
     return post
 
 
+async def refresh_rendered(post_id: int, content: str, db: AsyncSession) -> dict:
+    rendered = render_post(content)
+    await db.execute(
+        update(Post).where(Post.post_id == post_id).values(**rendered))
+    await feed_cache.bump(db)
+    await db.commit()
+    return rendered
+
+
+async def get_rendered_post(post_id: int, db: AsyncSession) -> Post:
+    # posts written by an older renderer are brought up to date on first read
+    post = await get_post_by_id(post_id, db)
+    if post.render_version != RENDERER_VERSION:
+        rendered = await refresh_rendered(post.post_id, post.content, db)
+        for name, value in rendered.items():
+            set_committed_value(post, name, value)
+    return post
+
+
+async def get_post_version(post_id: int, db: AsyncSession) -> datetime:
+    # the page embeds the author's profile too, so an avatar change is a new version
+    result = await db.execute(
+        select(Post.updated_at, User.updated_at.label("author_updated_at"))
+        .join(User, User.user_id == Post.user_id)
+        .where(Post.post_id == post_id, User.deleted_at.is_(None)))
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return max(version for version in row if version is not None)
+
+
 async def create_post(post: PostCreate, user_id: int, db: AsyncSession) -> PostRead:
     new_post = Post(
         title=post.title,
         content=post.content,
-        user_id=user_id)
+        user_id=user_id,
+        **render_post(post.content))
     db.add(new_post)
+    await feed_cache.bump(db)
     await db.commit()
     await db.refresh(new_post)
     result = await db.execute(
@@ -42,15 +102,35 @@ async def read_post(post_id: int, db: AsyncSession) -> PostRead:
 async def read_posts(
         db: AsyncSession,
         limit: int,
-        offset: int,
-        user_id: Optional[int] = None) -> List[PostRead]:
-    query = select(Post).options(selectinload(Post.user)).order_by(
-        Post.created_at.desc()).offset(offset).limit(limit)
+        cursor: Optional[str] = None,
+        user_id: Optional[int] = None,
+        generation: Optional[int] = None) -> Page[PostSummary]:
+    if generation is None:
+        generation = await feed_cache.current(db)
+    key = (user_id, cursor, limit)
+    cached = feed_cache.get(key, generation)
+    if cached is not None:
+        return cached
+    page_cursor = decode_cursor(cursor)
+    query = (
+        select(Post)
+        .join(User, User.user_id == Post.user_id)
+        .where(User.deleted_at.is_(None))
+        .options(defer(Post.content), defer(Post.content_html), selectinload(Post.user)))
     if user_id is not None:
         query = query.where(Post.user_id == user_id)
+    query = keyset_query(
+        query, (Post.created_at, Post.post_id), page_cursor, limit)
     result = await db.execute(query)
-    posts = result.scalars().all()
-    return [PostRead.model_validate(post) for post in posts]
+    posts, next_cursor, prev_cursor = build_page(
+        result.scalars().all(), page_cursor, limit,
+        key=lambda post: (post.created_at, post.post_id))
+    page = Page[PostSummary](
+        items=[PostSummary.model_validate(post) for post in posts],
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor)
+    feed_cache.set(key, page, generation)
+    return page
 
 
 async def update_post(post_id: int, new_post: PostUpdate, db: AsyncSession) -> PostRead:
@@ -59,12 +139,56 @@ async def update_post(post_id: int, new_post: PostUpdate, db: AsyncSession) -> P
         post.title = new_post.title
     if new_post.content is not None:
         post.content = new_post.content
+        for name, value in render_post(new_post.content).items():
+            setattr(post, name, value)
+    await feed_cache.bump(db)
     await db.commit()
     await db.refresh(post)
     return PostRead.model_validate(post)
 
 
 async def delete_post(post_id: int, db: AsyncSession) -> None:
-    post = await get_post_by_id(post_id, db)
-    await db.delete(post)
+    await get_post_version(post_id, db)
+    # comments go with it through the foreign key, without being loaded
+    await db.execute(delete(Post).where(Post.post_id == post_id))
+    await feed_cache.bump(db)
     await db.commit()
+
+
+def build_match_expression(query: str) -> Optional[str]:
+    terms = re.findall(r"\w+", query)[:_MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _highlight(value: str) -> str:
+    return str(escape(value)).replace(_MATCH_START, "<mark>").replace(_MATCH_END, "</mark>")
+
+
+async def search_posts(query: str, db: AsyncSession, page: int = 1, limit: int = 20) -> SearchPage:
+    match = build_match_expression(query)
+    if match is None:
+        return SearchPage(query=query, items=[], page=page)
+    result = await db.execute(
+        _SEARCH_SQL, {"match": match, "limit": limit + 1, "offset": (page - 1) * limit})
+    rows = result.mappings().all()
+    hits = [
+        PostSearchHit(
+            post_id=row["post_id"],
+            user_id=row["user_id"],
+            username=row["username"],
+            title_html=_highlight(row["title_html"]),
+            snippet_html=_highlight(row["snippet_html"]),
+            created_at=row["created_at"],
+            rank=row["rank"])
+        for row in rows[:limit]
+    ]
+    return SearchPage(
+        query=query,
+        items=hits,
+        page=page,
+        next_page=page + 1 if len(rows) > limit else None,
+        prev_page=page - 1 if page > 1 else None)
@@ -1,24 +1,34 @@
+import asyncio
+import sys
+from datetime import timedelta
 from fastapi import HTTPException
-from models import User
-from schemas import UserCreate, UserRead, UserUpdate
+from avatars import AvatarFiles, publish_avatar, remove_avatar
+from cache import feed_cache, principal_cache
+from config import PURGE_CHUNK_SIZE, PURGE_INLINE_LIMIT, PURGE_LEASE, PURGE_PAUSE
+from crud.crud_comment import recount_comments
+from models import Comment, Post, User, utcnow
+from pagination import build_page, decode_cursor, keyset_query
+from purge import purge_queue
+from schemas import AdminUserRow, Page, UserCreate, UserRead, UserUpdate
 from sqlalchemy.ext.asyncio import AsyncSession
-from passlib.context import CryptContext
-from sqlalchemy import select, or_, and_
-from typing import List
-import os
+from sqlalchemy import delete, func, select, update, or_, and_
+from security import hash_password, verify_password
+from sessions import session_backend
+from typing import List, Optional
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+async def release_avatar(avatar_url: str | None, avatar_variants: dict | None, db: AsyncSession) -> None:
+    # uploads are stored by content hash, so another account may share the files.
+    # Called after the write that drops the reference and before its commit:
+    # the transaction holds SQLite's write lock, so no upload can publish and
+    # commit a new reference between this check and the delete
+    result = await db.execute(
+        select(User.user_id).where(User.avatar_url == avatar_url).limit(1))
+    if result.first() is None:
+        await remove_avatar(avatar_url, avatar_variants)
 
-def hash_password(plain_password: str) -> str:
-    return pwd_context.hash(plain_password)
 
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-async def create_user(user: UserCreate, db: AsyncSession) -> UserRead:
+async def create_user(user: UserCreate, db: AsyncSession, avatar_files: AvatarFiles = ()) -> UserRead:
     existing_user = await db.execute(
         select(User).where(
             or_(User.email == user.email, User.username == user.username)
@@ -28,14 +38,18 @@ async def create_user(user: UserCreate, db: AsyncSession) -> UserRead:
         raise HTTPException(
             status_code=400, detail="User with this email or username already exists")
 
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password(user.password)
     new_user = User(
         username=user.username,
         gender=user.gender,
         avatar_url=user.avatar_url,
+        avatar_variants=user.avatar_variants,
         email=user.email,
         hashed_password=hashed_password)
     db.add(new_user)
+    # the flush takes the write lock, so a release of the same files waits for the commit
+    await db.flush()
+    await publish_avatar(avatar_files)
     await db.commit()
     await db.refresh(new_user)
     return UserRead.model_validate(new_user)
@@ -43,18 +57,19 @@ async def create_user(user: UserCreate, db: AsyncSession) -> UserRead:
 
 async def read_user(user_id: int, db: AsyncSession) -> UserRead:
     user = await db.get(User, user_id)
-    if not user:
+    if not user or user.deleted_at is not None:
         raise HTTPException(status_code=404, detail="User not found")
     return UserRead.model_validate(user)
 
 
 async def read_users(limit: int, offset: int, db: AsyncSession) -> List[UserRead]:
-    result = await db.execute(select(User).offset(offset).limit(limit))
+    result = await db.execute(
+        select(User).where(User.deleted_at.is_(None)).offset(offset).limit(limit))
     users = result.scalars().all()
     return [UserRead.model_validate(user) for user in users]
 
 
-async def update_user(user_id: int, updated_user: UserUpdate, db: AsyncSession) -> UserRead:
+async def update_user(user_id: int, updated_user: UserUpdate, db: AsyncSession, avatar_files: AvatarFiles = ()) -> UserRead:
     user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -82,48 +97,271 @@ async def update_user(user_id: int, updated_user: UserUpdate, db: AsyncSession)
         user.username = updated_user.username
     if updated_user.gender:
         user.gender = updated_user.gender
-    if updated_user.avatar_url:
-        if user.avatar_url and not user.avatar_url.endswith("default.png"):
-            try:
-                os.remove(user.avatar_url.lstrip("/"))
-            except Exception:
-                pass
+    replaced_avatar = None
+    if updated_user.avatar_url and updated_user.avatar_url != user.avatar_url:
+        replaced_avatar = (user.avatar_url, user.avatar_variants)
         user.avatar_url = updated_user.avatar_url
+        user.avatar_variants = updated_user.avatar_variants
     if updated_user.email:
         user.email = updated_user.email
 
+    # cached pages embed the author's public profile, so any profile change is visible
+    await feed_cache.bump(db)
+    if replaced_avatar is not None:
+        await release_avatar(*replaced_avatar, db)
+    await publish_avatar(avatar_files)
     await db.commit()
+    principal_cache.pop(user_id)
     await db.refresh(user)
     return UserRead.model_validate(user)
 
 
-async def update_password(user_id: int, current_password: str, new_password: str, confirm_password: str, db: AsyncSession) -> None:
+async def update_password(user_id: int, current_password: str, new_password: str, confirm_password: str, db: AsyncSession, keep_session: Optional[str] = None) -> None:
     if new_password != confirm_password:
         raise HTTPException(
             status_code=400, detail="New password and confirmation do not match")
     user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    if not verify_password(current_password, user.hashed_password):
+    if not await verify_password(current_password, user.hashed_password):
         raise HTTPException(
             status_code=400, detail="Current password is incorrect")
-    user.hashed_password = hash_password(new_password)
+    user.hashed_password = await hash_password(new_password)
     await db.commit()
+    principal_cache.pop(user_id)
+    # every other login of this account is signed out
+    await session_backend.delete_user_sessions(user_id, keep=keep_session)
     await db.refresh(user)
 
 
+async def _account_size(user_ids: List[int], db: AsyncSession) -> int:
+    # rows a hard delete would cascade to: posts, the comments on them and the
+    # accounts' own comments elsewhere
+    posts = await db.scalar(
+        select(func.coalesce(func.sum(Post.comment_count + 1), 0))
+        .where(Post.user_id.in_(user_ids)))
+    comments = await db.scalar(
+        select(func.count(Comment.comment_id)).where(Comment.user_id.in_(user_ids)))
+    return posts + comments
+
+
+async def _forget_users(user_ids: List[int]) -> None:
+    for user_id in user_ids:
+        principal_cache.pop(user_id)
+    await session_backend.delete_users_sessions(user_ids)
+
+
+async def _delete_users(users: list, db: AsyncSession) -> None:
+    user_ids = [user.user_id for user in users]
+    if await _account_size(user_ids, db) > PURGE_INLINE_LIMIT:
+        # hidden at once; purge_user removes the content in short transactions
+        await db.execute(
+            update(User).where(User.user_id.in_(user_ids)).values(deleted_at=utcnow()))
+        await feed_cache.bump(db)
+        await db.commit()
+        await _forget_users(user_ids)
+        for user_id in user_ids:
+            purge_queue.schedule(user_id)
+        return
+    commented = await db.execute(
+        select(Comment.post_id).where(Comment.user_id.in_(user_ids)).distinct())
+    commented_post_ids = commented.scalars().all()
+    # the foreign keys cascade to posts and comments inside the same statement
+    await db.execute(delete(User).where(User.user_id.in_(user_ids)))
+    await recount_comments(commented_post_ids, db)
+    await feed_cache.bump(db)
+    avatars = {user.avatar_url: user.avatar_variants for user in users if user.avatar_url}
+    for avatar_url, avatar_variants in avatars.items():
+        await release_avatar(avatar_url, avatar_variants, db)
+    await db.commit()
+    await _forget_users(user_ids)
+
+
 async def delete_user(user_id: int, db: AsyncSession) -> UserRead:
-    result = await db.execute(select(User).where(User.user_id == user_id))
-    user = result.scalar_one_or_none()
-    if not user:
+    user = await db.get(User, user_id)
+    if not user or user.deleted_at is not None:
         raise HTTPException(status_code=404, detail="User not found")
     deleted_user = UserRead.model_validate(user)
-    await db.delete(user)
-    await db.commit()
+    await _delete_users([user], db)
     return deleted_user
 
 
-async def read_non_admin_users(db: AsyncSession) -> List[UserRead]:
-    result = await db.execute(select(User).where(User.role != "admin"))
-    users = result.scalars().all()
-    return [UserRead.model_validate(user) for user in users]
+async def _claim_purge(user_id: int, owner: str, db: AsyncSession) -> bool:
+    # takes or renews the lease on a soft-deleted account; with several worker
+    # processes only the holder purges it, and a crashed holder's lease runs out
+    now = utcnow()
+    result = await db.execute(
+        update(User)
+        .where(User.user_id == user_id, User.deleted_at.is_not(None),
+               or_(User.purge_owner.is_(None), User.purge_owner == owner,
+                   User.purge_lease < now))
+        .values(purge_owner=owner, purge_lease=now + timedelta(seconds=PURGE_LEASE))
+        .execution_options(synchronize_session=False))
+    return result.rowcount == 1
+
+
+async def release_purge(user_id: int, owner: str, db: AsyncSession) -> None:
+    # lets another worker take over at once instead of waiting out the lease
+    await db.execute(
+        update(User)
+        .where(User.user_id == user_id, User.purge_owner == owner)
+        .values(purge_owner=None, purge_lease=None)
+        .execution_options(synchronize_session=False))
+    await db.commit()
+
+
+async def purge_lease_left(user_id: int, db: AsyncSession) -> Optional[float]:
+    # seconds until the current holder's lease runs out; None once the account is gone
+    result = await db.execute(
+        select(User.purge_lease).where(User.user_id == user_id, User.deleted_at.is_not(None)))
+    row = result.first()
+    if row is None:
+        return None
+    if row.purge_lease is None:
+        return 0.0
+    return max(0.0, (row.purge_lease - utcnow()).total_seconds())
+
+
+async def _delete_chunks(query, column, user_id: int, owner: str, db: AsyncSession, chunk_size: int) -> bool:
+    while True:
+        ids = (await db.execute(query.limit(chunk_size))).scalars().all()
+        if not ids:
+            return True
+        if not await _claim_purge(user_id, owner, db):
+            await db.rollback()
+            return False
+        await db.execute(delete(column.class_).where(column.in_(ids)))
+        await db.commit()
+        await asyncio.sleep(PURGE_PAUSE)
+
+
+async def purge_user(user_id: int, owner: str, db: AsyncSession, chunk_size: int = PURGE_CHUNK_SIZE) -> bool:
+    # every chunk is its own short transaction that also renews the lease, so
+    # other writers wait for one chunk at most rather than for the whole account
+    if not await _claim_purge(user_id, owner, db):
+        await db.rollback()
+        return False
+    await db.commit()
+    while True:
+        result = await db.execute(
+            select(Comment.comment_id, Comment.post_id)
+            .where(Comment.user_id == user_id)
+            .limit(chunk_size))
+        rows = result.all()
+        if not rows:
+            break
+        if not await _claim_purge(user_id, owner, db):
+            await db.rollback()
+            return False
+        await db.execute(
+            delete(Comment).where(Comment.comment_id.in_([row.comment_id for row in rows])))
+        await recount_comments({row.post_id for row in rows}, db)
+        await db.commit()
+        await asyncio.sleep(PURGE_PAUSE)
+    purged = await _delete_chunks(
+        select(Comment.comment_id)
+        .join(Post, Post.post_id == Comment.post_id)
+        .where(Post.user_id == user_id),
+        Comment.comment_id, user_id, owner, db, chunk_size)
+    purged = purged and await _delete_chunks(
+        select(Post.post_id).where(Post.user_id == user_id),
+        Post.post_id, user_id, owner, db, chunk_size)
+    if not purged:
+        return False
+    result = await db.execute(
+        select(User.avatar_url, User.avatar_variants).where(User.user_id == user_id))
+    avatar = result.first()
+    result = await db.execute(
+        delete(User).where(User.user_id == user_id, User.purge_owner == owner))
+    if result.rowcount == 0:
+        # the lease lapsed and another process finished the account
+        await db.rollback()
+        return False
+    if avatar.avatar_url:
+        await release_avatar(avatar.avatar_url, avatar.avatar_variants, db)
+    await feed_cache.bump(db)
+    await db.commit()
+    await _forget_users([user_id])
+    return True
+
+
+# sort name -> (keyset columns, newest first); each leading column is unique and indexed
+ADMIN_SORTS = {
+    "username": ((User.username,), False),
+    "email": ((User.email,), False),
+    "newest": ((User.user_id,), True),
+}
+
+
+def _prefix_range(column, prefix: str):
+    # a half-open range rather than LIKE, which SQLite can't serve from an index;
+    # trailing U+10FFFF has no successor, so the bound comes from the rest
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return column >= prefix
+    successor = ord(stem[-1]) + 1
+    if 0xD800 <= successor <= 0xDFFF:
+        # surrogates can't be encoded for SQLite
+        successor = 0xE000
+    return and_(column >= prefix, column < stem[:-1] + chr(successor))
+
+
+async def read_admin_users(
+        db: AsyncSession,
+        limit: int,
+        cursor: Optional[str] = None,
+        sort: str = "username",
+        prefix: Optional[str] = None) -> Page[AdminUserRow]:
+    columns, descending = ADMIN_SORTS[sort]
+    page_cursor = decode_cursor(cursor)
+    # correlated counts are only evaluated for the rows on this page
+    post_count = (
+        select(func.count(Post.post_id))
+        .where(Post.user_id == User.user_id)
+        .scalar_subquery())
+    comment_count = (
+        select(func.count(Comment.comment_id))
+        .where(Comment.user_id == User.user_id)
+        .scalar_subquery())
+    query = select(
+        User.user_id, User.username, User.email, User.role,
+        post_count.label("post_count"), comment_count.label("comment_count")
+    ).where(User.deleted_at.is_(None), User.role != "admin")
+    if prefix:
+        query = query.where(or_(
+            _prefix_range(User.username, prefix), _prefix_range(User.email, prefix)))
+    query = keyset_query(query, columns, page_cursor, limit, descending=descending)
+    result = await db.execute(query)
+    rows, next_cursor, prev_cursor = build_page(
+        result.all(), page_cursor, limit,
+        key=lambda row: tuple(getattr(row, column.key) for column in columns))
+    return Page[AdminUserRow](
+        items=[AdminUserRow.model_validate(row) for row in rows],
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor)
+
+
+async def bulk_set_role(user_ids: List[int], role: str, db: AsyncSession) -> int:
+    if not user_ids:
+        return 0
+    # admins are not listed and can't be acted on in bulk
+    result = await db.execute(
+        update(User).where(User.user_id.in_(user_ids), User.role != "admin").values(role=role))
+    await feed_cache.bump(db)
+    await db.commit()
+    for user_id in user_ids:
+        principal_cache.pop(user_id)
+    return result.rowcount
+
+
+async def bulk_delete_users(user_ids: List[int], db: AsyncSession) -> int:
+    if not user_ids:
+        return 0
+    result = await db.execute(
+        select(User.user_id, User.avatar_url, User.avatar_variants)
+        .where(User.user_id.in_(user_ids), User.deleted_at.is_(None), User.role != "admin"))
+    users = result.all()
+    if not users:
+        return 0
+    await _delete_users(users, db)
+    return len(users)
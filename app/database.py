@@ -1,9 +1,67 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from typing import AsyncGenerator
-from config import DATABASE_URL
+from config import (
+    DATABASE_URL, DB_ECHO, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_SIZE, DB_POOL_TIMEOUT,
+    SLOW_QUERY_MS, SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE, SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE, SQLITE_SYNCHRONOUS)
+from metrics import Gauge, MeteredQueuePool, instrument_engine, registry
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+
+def _sqlite_pragmas() -> list:
+    return [
+        f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size={SQLITE_CACHE_SIZE}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        "PRAGMA foreign_keys=ON",
+    ]
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for pragma in _sqlite_pragmas():
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def create_engine(url: str = DATABASE_URL, **options) -> AsyncEngine:
+    database = make_url(url)
+    settings = {"echo": DB_ECHO}
+    if database.get_backend_name() != "sqlite" or database.database not in (None, "", ":memory:"):
+        settings.update(
+            poolclass=MeteredQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE)
+    settings.update(options)
+    engine = create_async_engine(url, **settings)
+    if database.get_backend_name() == "sqlite":
+        event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    instrument_engine(engine, SLOW_QUERY_MS / 1000)
+    return engine
+
+
+engine = create_engine()
+
+
+def _pool_metrics():
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return ()
+    checked_out = Gauge("db_pool_checked_out", "Connections currently checked out.")
+    checked_out.set(value=pool.checkedout())
+    overflow = Gauge("db_pool_overflow", "Connections open beyond pool_size.")
+    overflow.set(value=max(pool.overflow(), 0))
+    return checked_out, overflow
+
+
+registry.add_collector(_pool_metrics)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -15,3 +73,8 @@ AsyncSessionLocal = sessionmaker(
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+def get_session_factory() -> sessionmaker:
+    # for streamed responses, which outlive the request's get_db session
+    return AsyncSessionLocal
@@ -0,0 +1,28 @@
+import math
+import re
+
+EXCERPT_LENGTH = 200
+WORDS_PER_MINUTE = 200
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def make_excerpt(text: str, length: int = EXCERPT_LENGTH) -> str:
+    text = _WHITESPACE.sub(" ", text).strip()
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    # end on a word boundary unless that would throw most of it away
+    space = cut.rfind(" ")
+    if space > length // 2:
+        cut = cut[:space]
+    return cut.rstrip(" .,;:") + "…"
+
+
+def summarize(text: str) -> dict:
+    word_count = len(text.split())
+    return {
+        "excerpt": make_excerpt(text),
+        "word_count": word_count,
+        "reading_time": max(1, math.ceil(word_count / WORDS_PER_MINUTE)) if word_count else 0,
+    }
@@ -1,25 +1,74 @@
 import asyncio
-import sqlite3
-from config import DATABASE_URL
-from sqlalchemy.ext.asyncio import create_async_engine
-from sqlalchemy import event
-from models import Base
+import logging
+from pathlib import Path
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from config import DATABASE_URL, DB_AUTO_UPGRADE
+from database import engine
+from models import SCHEMA_REVISION
 
+logger = logging.getLogger(__name__)
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
 
 
-@event.listens_for(engine.sync_engine, "connect")
-def enable_foreign_keys(dbapi_connection, connection_record):
-    if isinstance(dbapi_connection, sqlite3.Connection):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.close()
+def sync_database_url(url: str = DATABASE_URL) -> str:
+    database = make_url(url)
+    driver = database.drivername.split("+")[0]
+    return database.set(drivername=driver).render_as_string(hide_password=False)
 
 
-async def init_model():
-    async with engine.begin() as connection:
-        await connection.run_sync(Base.metadata.create_all)
+def alembic_config():
+    # alembic is only imported when a migration actually has to run
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    config.set_main_option("sqlalchemy.url", sync_database_url().replace("%", "%%"))
+    # keep the running server's logging setup intact
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def upgrade(revision: str = SCHEMA_REVISION) -> None:
+    from alembic import command
+
+    command.upgrade(alembic_config(), revision)
+
+
+async def current_revision() -> Optional[str]:
+    # this is also the first checkout, so it warms the pool for the first request
+    async with engine.connect() as connection:
+        try:
+            result = await connection.execute(text("SELECT version_num FROM alembic_version"))
+        except OperationalError:
+            return None
+        return result.scalar()
+
+
+async def check_schema() -> None:
+    current = await current_revision()
+    if current == SCHEMA_REVISION:
+        return
+    if not DB_AUTO_UPGRADE:
+        raise RuntimeError(
+            f"Database schema is at revision {current}, expected {SCHEMA_REVISION}. "
+            "Run 'alembic upgrade head' or set DB_AUTO_UPGRADE=1.")
+    logger.warning("Upgrading database schema from %s to %s", current, SCHEMA_REVISION)
+    await asyncio.to_thread(upgrade)
+
+
+async def check_foreign_keys() -> None:
+    # deletes rely on ON DELETE CASCADE instead of the ORM loading children
+    if engine.dialect.name != "sqlite":
+        return
+    async with engine.connect() as connection:
+        enabled = (await connection.execute(text("PRAGMA foreign_keys"))).scalar()
+    if not enabled:
+        raise RuntimeError("SQLite foreign key enforcement is off; deletes would leave orphaned rows")
+
 
 if __name__ == "__main__":
-    asyncio.run(init_model())
+    upgrade()
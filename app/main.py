@@ -1,7 +1,5 @@
 from fastapi import FastAPI
 from fastapi.requests import Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.exception_handlers import http_exception_handler
 from fastapi.exceptions import HTTPException
 from routers.app_routes import router
@@ -10,21 +8,67 @@ from routers.user_routes import user_router
 from routers.auth_routes import auth_router
 from routers.admin_routes import admin_router
 from routers.comment_routes import comment_router
-from init_db import init_model
-from config import SECRET_KEY
-from starlette.middleware.sessions import SessionMiddleware
+from routers.search_routes import search_router
+from routers.api_routes import api_router
+from routers.metrics_routes import metrics_router
+from init_db import check_foreign_keys, check_schema
+import avatars
+import security
+from config import (
+    AVATAR_MAX_BYTES,
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIN_SIZE,
+    SESSION_COOKIE_NAME,
+    SESSION_HTTPS_ONLY,
+    SESSION_MAX_AGE,
+    SESSION_PURGE_INTERVAL,
+)
+from metrics import MetricsMiddleware
+from middleware import BodySizeLimitMiddleware, CompressionMiddleware
+from purge import purge_queue
+from sessions import ServerSessionMiddleware, session_backend
+from static_files import CachedStaticFiles
+from templating import render_template, warm_up
 
 
 async def lifespan(app: FastAPI):
-    await init_model()
+    await check_schema()
+    await check_foreign_keys()
+    warm_up()
+    await purge_queue.resume()
     yield
+    await purge_queue.stop()
+    security.shutdown_executor()
+    avatars.shutdown_executor()
 
 app = FastAPI(lifespan=lifespan)
 
-templates = Jinja2Templates("templates")
-
-app.mount("/static", StaticFiles(directory="static"), name="static")
-app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
+app.add_middleware(
+    ServerSessionMiddleware,
+    backend=session_backend,
+    cookie_name=SESSION_COOKIE_NAME,
+    max_age=SESSION_MAX_AGE,
+    https_only=SESSION_HTTPS_ONLY,
+    purge_interval=SESSION_PURGE_INTERVAL,
+    exclude_paths=("/static/", "/metrics"))
+# the avatar is the only large part of these forms; leave room for the text fields
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=AVATAR_MAX_BYTES + 64 * 1024,
+    paths=("/users/register", "/users/me/edit-profile"))
+# /static serves its own precompressed siblings and already-compressed media
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_SIZE,
+    gzip_level=COMPRESSION_GZIP_LEVEL,
+    brotli_quality=COMPRESSION_BROTLI_QUALITY,
+    content_types=("text/html", "application/json", "text/plain", "text/css",
+                   "application/javascript", "image/svg+xml"),
+    exclude_paths=("/static/",))
+# outermost, so latency includes compression and the session store
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(router)
 app.include_router(post_router)
@@ -32,17 +76,23 @@ app.include_router(user_router)
 app.include_router(auth_router)
 app.include_router(admin_router)
 app.include_router(comment_router)
+app.include_router(search_router)
+app.include_router(api_router)
+app.include_router(metrics_router)
 
 
 @app.exception_handler(HTTPException)
 async def custom_http_exception_handler(request: Request, exc: HTTPException):
     if exc.status_code == 401:
-        return templates.TemplateResponse(
+        return await render_template(
             "error.html", {"request": request, "detail": exc.detail, "status_code": exc.status_code}, status_code=401)
     elif exc.status_code == 403:
-        return templates.TemplateResponse(
+        return await render_template(
             "error.html", {"request": request, "detail": exc.detail, "status_code": exc.status_code}, status_code=403)
     elif exc.status_code == 404:
-        return templates.TemplateResponse(
+        return await render_template(
             "error.html", {"request": request, "detail": exc.detail, "status_code": exc.status_code}, status_code=404)
+    elif exc.status_code == 429:
+        return await render_template(
+            "error.html", {"request": request, "detail": exc.detail, "status_code": exc.status_code}, status_code=429, headers=exc.headers)
     return await http_exception_handler(request, exc)
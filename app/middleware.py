@@ -0,0 +1,190 @@
+import zlib
+from typing import Iterable, Optional
+from fastapi import HTTPException
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from metrics import Counter, registry
+from static_files import accepted_encodings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class BodySizeLimitMiddleware:
+    def __init__(self, app: ASGIApp, max_bytes: int, paths: Iterable[str]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                await self._reject(send)
+                return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # raised while the form is being parsed, before it is spooled further
+                    raise HTTPException(status_code=413, detail="Request body is too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send: Send) -> None:
+        body = b'{"detail":"Request body is too large"}'
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# running totals for the compression middleware: bytes handed to it and bytes
+# actually sent, per content coding
+compression_stats = {
+    coding: {"responses": 0, "bytes_in": 0, "bytes_out": 0} for coding in ("br", "gzip")}
+
+
+def _compression_metrics():
+    responses = Counter(
+        "http_compressed_responses_total", "Responses compressed.", ("coding",))
+    bytes_in = Counter(
+        "http_compression_input_bytes_total", "Body bytes before compression.", ("coding",))
+    bytes_out = Counter(
+        "http_compression_output_bytes_total", "Body bytes sent after compression.", ("coding",))
+    for coding, stats in compression_stats.items():
+        responses.inc(coding, amount=stats["responses"])
+        bytes_in.inc(coding, amount=stats["bytes_in"])
+        bytes_out.inc(coding, amount=stats["bytes_out"])
+    return responses, bytes_in, bytes_out
+
+
+registry.add_collector(_compression_metrics)
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        # wbits 31: gzip container
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def process(self, data: bytes, final: bool) -> bytes:
+        # a sync flush per chunk so streamed pages reach the client progressively
+        mode = zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+        return self._compressor.compress(data) + self._compressor.flush(mode)
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality, mode=brotli.MODE_TEXT)
+
+    def process(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.process(data)
+        return output + (self._compressor.finish() if final else self._compressor.flush())
+
+
+class CompressionMiddleware:
+    def __init__(
+            self,
+            app: ASGIApp,
+            minimum_size: int = 512,
+            gzip_level: int = 6,
+            brotli_quality: int = 4,
+            content_types: Iterable[str] = (),
+            exclude_paths: Iterable[str] = ()):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.content_types = frozenset(content_types)
+        self.exclude_paths = tuple(exclude_paths)
+
+    def _choose_coding(self, scope: Scope) -> Optional[str]:
+        accepted = accepted_encodings(Headers(scope=scope))
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _should_compress(self, message: Message) -> bool:
+        if message["status"] < 200 or message["status"] in (204, 304):
+            return False
+        headers = Headers(raw=message["headers"])
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+        return content_type in self.content_types
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+        coding = self._choose_coding(scope)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        encoder = None
+        passthrough = False
+        stats = compression_stats[coding]
+
+        async def compressing_send(message: Message) -> None:
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                if self._should_compress(message):
+                    start = message
+                else:
+                    passthrough = True
+                    await send(message)
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                # a complete small body is not worth the header overhead;
+                # streamed bodies are always compressed
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                encoder = (_BrotliEncoder(self.brotli_quality) if coding == "br"
+                           else _GzipEncoder(self.gzip_level))
+                headers = MutableHeaders(raw=start["headers"])
+                del headers["content-length"]
+                headers["content-encoding"] = coding
+                headers.add_vary_header("Accept-Encoding")
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # the encoded bytes differ from the identity representation
+                    headers["etag"] = f"W/{etag}"
+                await send(start)
+                stats["responses"] += 1
+
+            output = encoder.process(body, final=not more_body)
+            stats["bytes_in"] += len(body)
+            stats["bytes_out"] += len(output)
+            await send({"type": "http.response.body", "body": output, "more_body": more_body})
+
+        await self.app(scope, receive, compressing_send)
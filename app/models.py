@@ -1,12 +1,20 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Enum, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import DDL, JSON, Column, Enum, DateTime, ForeignKey, Index, Integer, String, Text, event
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from datetime import datetime, timezone
 import enum
 
 
 Base = declarative_base()
 
+# alembic revision this code expects; bump it together with every migration
+SCHEMA_REVISION = "b5d9e3f7a204"
+
+
+def utcnow() -> datetime:
+    # stored with microseconds so keyset cursors compare against the same format
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 
 class GenderEnum(str, enum.Enum):
     male = "male"
@@ -23,12 +31,22 @@ class User(Base):
     role = Column(String, default="user")
     avatar_url = Column(String, nullable=True,
                         default="/static/avatars/default.png")
+    avatar_variants = Column(JSON, nullable=True)
     gender = Column(Enum(GenderEnum, name="gender_enum"), nullable=False)
+    # versions the public profile that post pages embed
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+    # set when a large account is queued for a chunked purge; the account is
+    # hidden from then on and the row goes once its posts and comments have
+    deleted_at = Column(DateTime, nullable=True)
+    # the worker process purging the account, and until when its claim holds
+    purge_owner = Column(String, nullable=True)
+    purge_lease = Column(DateTime, nullable=True)
 
+    # the foreign keys cascade in the database, so deletes never load these
     posts = relationship("Post", back_populates="user",
-                         cascade="all, delete-orphan")
+                         cascade="all, delete-orphan", passive_deletes=True)
     comments = relationship(
-        "Comment", back_populates="user", cascade="all, delete-orphan")
+        "Comment", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Post(Base):
@@ -39,11 +57,54 @@ class Post(Base):
         "user.user_id", ondelete="CASCADE"), nullable=False)
     title = Column(String, nullable=False)
     content = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=func.now(), nullable=False)
+    # sanitized HTML rendered from the markdown in content
+    content_html = Column(Text)
+    render_version = Column(Integer, default=0, server_default="0", nullable=False)
+    # derived from content on every write so feeds never load the body
+    excerpt = Column(String, default="", server_default="", nullable=False)
+    word_count = Column(Integer, default=0, server_default="0", nullable=False)
+    reading_time = Column(Integer, default=0, server_default="0", nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+    comment_count = Column(Integer, default=0,
+                           server_default="0", nullable=False)
+    # also bumped by comment writes, so it versions the whole thread
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
 
     user = relationship("User", back_populates="posts")
     comments = relationship(
-        "Comment", back_populates="post", cascade="all, delete-orphan")
+        "Comment", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_post_created_at_post_id", "created_at", "post_id"),
+        Index("ix_post_user_id_created_at", "user_id", "created_at"),
+    )
+
+
+POST_FTS_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS post_fts USING fts5(
+        title, content, content='post', content_rowid='post_id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS post_fts_ai AFTER INSERT ON post BEGIN
+        INSERT INTO post_fts(rowid, title, content)
+        VALUES (new.post_id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS post_fts_ad AFTER DELETE ON post BEGIN
+        INSERT INTO post_fts(post_fts, rowid, title, content)
+        VALUES ('delete', old.post_id, old.title, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS post_fts_au AFTER UPDATE OF title, content ON post BEGIN
+        INSERT INTO post_fts(post_fts, rowid, title, content)
+        VALUES ('delete', old.post_id, old.title, old.content);
+        INSERT INTO post_fts(rowid, title, content)
+        VALUES (new.post_id, new.title, new.content);
+    END""",
+)
+
+for statement in POST_FTS_DDL:
+    event.listen(Post.__table__, "after_create",
+                 DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Post.__table__, "before_drop",
+             DDL("DROP TABLE IF EXISTS post_fts").execute_if(dialect="sqlite"))
 
 
 class Comment(Base):
@@ -54,7 +115,33 @@ class Comment(Base):
     user_id = Column(Integer, ForeignKey(
         "user.user_id", ondelete="CASCADE"), nullable=False)
     content = Column(String, nullable=False)
-    created_at = Column(DateTime, default=func.now(), nullable=False)
+    created_at = Column(DateTime, default=utcnow, nullable=False)
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
 
     user = relationship("User", back_populates="comments")
     post = relationship("Post", back_populates="comments")
+
+    __table_args__ = (
+        Index("ix_comments_post_id_created_at", "post_id", "created_at"),
+        Index("ix_comments_user_id", "user_id"),
+    )
+
+
+class UserSession(Base):
+    __tablename__ = "sessions"
+
+    session_id = Column(String, primary_key=True)
+    # kept for revocation only; not a foreign key so deleting a user never
+    # has to wait on session writes
+    user_id = Column(Integer, index=True)
+    data = Column(JSON, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class CacheGeneration(Base):
+    # bumped in the same transaction as every write that cached pages depend
+    # on, so all worker processes agree on which cached entries are stale
+    __tablename__ = "cache_generation"
+
+    name = Column(String, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,115 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from sqlalchemy import DateTime, Select, literal, tuple_
+
+
+@dataclass(frozen=True)
+class Cursor:
+    direction: str
+    values: Tuple[Any, ...]
+
+
+def encode_cursor(values: Sequence[Any], direction: str = "next") -> str:
+    payload = [direction, [v.isoformat() if isinstance(
+        v, datetime) else v for v in values]]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, values = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if direction not in ("next", "prev") or not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return Cursor(direction=direction, values=tuple(values))
+
+
+def _bind_values(columns: Sequence[Any], values: Sequence[Any]) -> list:
+    if len(columns) != len(values):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    bound = []
+    for column, value in zip(columns, values):
+        if isinstance(column.type, DateTime) and isinstance(value, str):
+            try:
+                value = datetime.fromisoformat(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        bound.append(literal(value, type_=column.type))
+    return bound
+
+
+def keyset_query(
+        query: Select,
+        columns: Sequence[Any],
+        cursor: Optional[Cursor],
+        limit: int,
+        descending: bool = True) -> Select:
+    # one extra row tells build_page whether another page exists
+    backwards = cursor is not None and cursor.direction == "prev"
+    newest_first = descending != backwards
+    if cursor is not None:
+        key = tuple_(*columns)
+        bound = tuple_(*_bind_values(columns, cursor.values))
+        query = query.where(key < bound if newest_first else key > bound)
+    order = [c.desc() if newest_first else c.asc() for c in columns]
+    return query.order_by(*order).limit(limit + 1)
+
+
+def page_cursors(
+        first: Any,
+        last: Any,
+        cursor: Optional[Cursor],
+        has_more: bool,
+        key: Callable[[Any], Sequence[Any]]) -> Tuple[Optional[str], Optional[str]]:
+    # first/last are the page's items in display order
+    backwards = cursor is not None and cursor.direction == "prev"
+    if backwards:
+        next_cursor = encode_cursor(key(last), "next")
+        prev_cursor = encode_cursor(key(first), "prev") if has_more else None
+    else:
+        next_cursor = encode_cursor(key(last), "next") if has_more else None
+        prev_cursor = encode_cursor(
+            key(first), "prev") if cursor is not None else None
+    return next_cursor, prev_cursor
+
+
+def build_page(
+        rows: Sequence[Any],
+        cursor: Optional[Cursor],
+        limit: int,
+        key: Callable[[Any], Sequence[Any]]) -> Tuple[list, Optional[str], Optional[str]]:
+    backwards = cursor is not None and cursor.direction == "prev"
+    has_more = len(rows) > limit
+    items = list(rows[:limit])
+    if backwards:
+        items.reverse()
+    if not items:
+        return items, None, None
+    next_cursor, prev_cursor = page_cursors(items[0], items[-1], cursor, has_more, key)
+    return items, next_cursor, prev_cursor
+
+
+class PageStream:
+    """A page whose items are produced while a template iterates over it.
+
+    next_cursor and prev_cursor are only known once iteration has finished,
+    so templates must read them after the loop.
+    """
+
+    def __init__(self, items: Callable[["PageStream"], AsyncIterator[Any]]):
+        self.next_cursor: Optional[str] = None
+        self.prev_cursor: Optional[str] = None
+        self._items = items
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self._items(self).__aiter__()
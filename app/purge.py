@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import os
+import secrets
+import socket
+from typing import Dict, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+from database import AsyncSessionLocal
+from models import User
+
+logger = logging.getLogger(__name__)
+
+
+class PurgeQueue:
+    # one worker per process purges soft-deleted accounts one at a time; every
+    # process resumes the same accounts at startup, but each account is leased
+    # to a single owner, so purges don't compete for the write lock
+
+    def __init__(self, session_factory: sessionmaker):
+        self.session_factory = session_factory
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        self._pending: Dict[int, None] = {}
+        self._retries: Dict[int, asyncio.TimerHandle] = {}
+        self._worker: Optional[asyncio.Task] = None
+
+    def schedule(self, user_id: int) -> None:
+        retry = self._retries.pop(user_id, None)
+        if retry is not None:
+            retry.cancel()
+        self._pending.setdefault(user_id)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        # imported here because crud_user schedules purges through this module
+        from crud.crud_user import purge_lease_left, purge_user
+
+        while self._pending:
+            user_id = next(iter(self._pending))
+            try:
+                async with self.session_factory() as db:
+                    if not await purge_user(user_id, self.owner, db):
+                        wait = await purge_lease_left(user_id, db)
+                        if wait is not None:
+                            self._retry(user_id, wait)
+            except asyncio.CancelledError:
+                await self._release(user_id)
+                raise
+            except Exception:
+                # deleted_at is still set, so the next start picks it up again
+                logger.exception("Purging user %s failed", user_id)
+                await self._release(user_id)
+            self._pending.pop(user_id, None)
+
+    def _retry(self, user_id: int, wait: float) -> None:
+        # the holder may stop or die without finishing, so try again once its lease is up
+        logger.info("User %s is being purged by another worker, retrying in %.0fs", user_id, wait)
+        self._retries[user_id] = asyncio.get_running_loop().call_later(
+            wait + 1, self.schedule, user_id)
+
+    async def _release(self, user_id: int) -> None:
+        from crud.crud_user import release_purge
+
+        try:
+            async with self.session_factory() as db:
+                await release_purge(user_id, self.owner, db)
+        except Exception:
+            logger.exception("Releasing the purge of user %s failed", user_id)
+
+    async def resume(self) -> None:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(User.user_id).where(User.deleted_at.is_not(None)))
+            user_ids = result.scalars().all()
+        if user_ids:
+            logger.info("Resuming purge of %d deleted accounts", len(user_ids))
+        for user_id in user_ids:
+            self.schedule(user_id)
+
+    async def join(self) -> None:
+        if self._worker is not None:
+            await self._worker
+
+    async def stop(self) -> None:
+        # an interrupted purge gives up its lease, so whichever worker starts
+        # next resumes it from where it stopped
+        for handle in self._retries.values():
+            handle.cancel()
+        self._retries.clear()
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+
+purge_queue = PurgeQueue(AsyncSessionLocal)
@@ -0,0 +1,118 @@
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Hashable, Optional
+from fastapi import HTTPException
+from cache import LRUCache
+from config import (
+    LOGIN_ACCOUNT_ATTEMPTS,
+    LOGIN_ACCOUNT_WINDOW,
+    LOGIN_IP_BURST,
+    LOGIN_IP_PER_MINUTE,
+    LOGIN_MAX_PENDING,
+    RATE_LIMIT_KEYS,
+)
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, per_second: float, maxkeys: int):
+        self.capacity = capacity
+        self.per_second = per_second
+        # least recently seen keys are forgotten first, which only ever
+        # hands them a full bucket again
+        self._buckets = LRUCache(maxkeys)
+
+    def acquire(self, key: Hashable) -> float:
+        """Take one token; returns 0 on success or the seconds until one is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key) or (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - updated) * self.per_second)
+        if tokens < 1:
+            self._buckets.set(key, (tokens, now))
+            return (1 - tokens) / self.per_second
+        self._buckets.set(key, (tokens - 1, now))
+        return 0.0
+
+
+class SlidingWindow:
+    def __init__(self, limit: int, window: float, maxkeys: int):
+        self.limit = limit
+        self.window = window
+        self._hits = LRUCache(maxkeys)
+
+    def hit(self, key: Hashable) -> float:
+        """Record one hit; returns 0 if within the limit or the seconds until the oldest expires."""
+        now = time.monotonic()
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = deque()
+            self._hits.set(key, hits)
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        if len(hits) >= self.limit:
+            return hits[0] + self.window - now
+        hits.append(now)
+        return 0.0
+
+    def reset(self, key: Hashable) -> None:
+        self._hits.pop(key)
+
+
+def account_key(user_id: Optional[int], identifier: str) -> str:
+    # a known account has one window whichever of its names was typed; unknown
+    # identifiers still get their own so probing them is limited too
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"name:{identifier.strip().lower()}"
+
+
+def too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Too many login attempts, try again later",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+class LoginThrottle:
+    """Guards /login before any password hash is checked.
+
+    Each client address gets a token bucket and each account a sliding window
+    of attempts, and only max_pending bcrypt verifications may be queued at
+    once so a burst from many addresses is shed instead of saturating CPU.
+    """
+
+    def __init__(self, per_ip: TokenBucket, per_account: SlidingWindow, max_pending: int):
+        self.per_ip = per_ip
+        self.per_account = per_account
+        self.max_pending = max_pending
+        self.pending = 0
+
+    def check_client(self, client: str) -> None:
+        retry_after = self.per_ip.acquire(client)
+        if retry_after:
+            raise too_many_requests(retry_after)
+
+    def check_account(self, account: str) -> None:
+        retry_after = self.per_account.hit(account)
+        if retry_after:
+            raise too_many_requests(retry_after)
+
+    def succeeded(self, account: str) -> None:
+        self.per_account.reset(account)
+
+    @asynccontextmanager
+    async def verification(self):
+        if self.pending >= self.max_pending:
+            raise too_many_requests(1)
+        self.pending += 1
+        try:
+            yield
+        finally:
+            self.pending -= 1
+
+
+login_throttle = LoginThrottle(
+    TokenBucket(LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE / 60, RATE_LIMIT_KEYS),
+    SlidingWindow(LOGIN_ACCOUNT_ATTEMPTS, LOGIN_ACCOUNT_WINDOW, RATE_LIMIT_KEYS),
+    LOGIN_MAX_PENDING)
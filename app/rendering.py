@@ -0,0 +1,49 @@
+import html
+import markdown
+import nh3
+from excerpts import summarize
+
+# bump whenever the markdown extensions or the sanitizer policy change; posts
+# rendered by an older version are re-rendered on read or by rerender_posts.py
+RENDERER_VERSION = 1
+
+MARKDOWN_EXTENSIONS = ["fenced_code", "tables", "sane_lists"]
+
+ALLOWED_TAGS = {
+    "a", "abbr", "blockquote", "br", "code", "del", "em", "h1", "h2", "h3",
+    "h4", "h5", "h6", "hr", "img", "li", "ol", "p", "pre", "strong", "table",
+    "tbody", "td", "th", "thead", "tr", "ul",
+}
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "abbr": {"title"},
+    "code": {"class"},
+    "img": {"src", "alt", "title"},
+    "td": {"align"},
+    "th": {"align"},
+}
+URL_SCHEMES = {"http", "https", "mailto"}
+
+
+def render_markdown(text: str) -> str:
+    rendered = markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS)
+    return nh3.clean(
+        rendered,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        url_schemes=URL_SCHEMES,
+        link_rel="nofollow noopener noreferrer")
+
+
+def html_to_text(fragment: str) -> str:
+    return html.unescape(nh3.clean(fragment, tags=set()))
+
+
+def render_post(content: str) -> dict:
+    # everything derived from the markdown source, ready to set on a Post
+    content_html = render_markdown(content)
+    return {
+        "content_html": content_html,
+        "render_version": RENDERER_VERSION,
+        **summarize(html_to_text(content_html)),
+    }
@@ -0,0 +1,73 @@
+"""Re-render post markdown to sanitized HTML across a process pool.
+
+Only posts whose render_version is older than rendering.RENDERER_VERSION are
+touched unless --all is given. Run it after bumping the renderer version so
+readers do not pay for lazy re-rendering; a running server keeps serving its
+cached feed pages until its next write.
+
+    python rerender_posts.py --workers 4
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import bindparam, select, update
+from database import AsyncSessionLocal, engine
+from models import Post
+from rendering import RENDERER_VERSION, render_post
+
+
+def render_batch(rows: list) -> list:
+    return [{"b_post_id": post_id, **render_post(content)} for post_id, content in rows]
+
+
+async def rerender(workers: int, batch_size: int, force: bool = False) -> int:
+    loop = asyncio.get_running_loop()
+    statement = (
+        update(Post.__table__)
+        .where(Post.__table__.c.post_id == bindparam("b_post_id"))
+        .values({name: bindparam(name) for name in (
+            "content_html", "render_version", "excerpt", "word_count", "reading_time")}))
+    done = 0
+    last_id = 0
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        async with AsyncSessionLocal() as db:
+            pending = []
+            while True:
+                query = select(Post.post_id, Post.content).where(Post.post_id > last_id)
+                if not force:
+                    query = query.where(Post.render_version != RENDERER_VERSION)
+                rows = (await db.execute(
+                    query.order_by(Post.post_id).limit(batch_size))).all()
+                if rows:
+                    last_id = rows[-1].post_id
+                    pending.append(loop.run_in_executor(
+                        executor, render_batch, [tuple(row) for row in rows]))
+                # keep every worker busy while finished batches are written
+                if pending and (len(pending) >= workers or not rows):
+                    rendered = await pending.pop(0)
+                    await db.execute(statement, rendered)
+                    await db.commit()
+                    done += len(rendered)
+                    print(f"{done} posts re-rendered ({done / (time.perf_counter() - started):.0f}/s)")
+                if not rows and not pending:
+                    break
+    await engine.dispose()
+    return done
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--all", action="store_true",
+                        help="re-render every post, not just outdated ones")
+    args = parser.parse_args()
+    done = asyncio.run(rerender(args.workers, args.batch_size, force=args.all))
+    print(f"done: {done} posts at renderer version {RENDERER_VERSION}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,55 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Form, HTTPException, Query, Request
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 from auth import get_current_user, check_admin
-from crud.crud_user import read_non_admin_users, delete_user
+from crud.crud_user import bulk_delete_users, bulk_set_role, delete_user, read_admin_users
 from database import get_db
+from templating import render_template
+from typing import List, Literal, Optional
 
+MAX_BULK_USERS = 500
 
 admin_router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 
 @admin_router.get("/admin/users")
-async def list_users(request: Request, db: AsyncSession = Depends(get_db)):
+async def list_users(
+        request: Request,
+        cursor: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=200),
+        sort: Literal["username", "email", "newest"] = "username",
+        q: str = Query("", max_length=100),
+        db: AsyncSession = Depends(get_db)):
     user = await get_current_user(request, db)
     await check_admin(user)
-    users_data = await read_non_admin_users(db)
-    return templates.TemplateResponse("admin_panel.html", {"request": request, "users": users_data})
+    page = await read_admin_users(db, limit=limit, cursor=cursor, sort=sort, prefix=q.strip() or None)
+    return await render_template("admin_panel.html", {
+        "request": request,
+        "users": page.items,
+        "page": page,
+        "sort": sort,
+        "q": q,
+        "current_user_id": user.user_id})
+
+
+@admin_router.post("/admin/users/bulk")
+async def bulk_users_route(
+        request: Request,
+        action: Literal["delete", "set_role"] = Form(...),
+        user_ids: List[int] = Form([]),
+        role: Literal["user", "admin"] = Form("user"),
+        db: AsyncSession = Depends(get_db)):
+    user = await get_current_user(request, db)
+    await check_admin(user)
+    if len(user_ids) > MAX_BULK_USERS:
+        raise HTTPException(status_code=400, detail="Too many users selected")
+    # an admin can't delete or demote their own account from here
+    selected = sorted(set(user_ids) - {user.user_id})
+    if action == "delete":
+        await bulk_delete_users(selected, db)
+    else:
+        await bulk_set_role(selected, role, db)
+    return RedirectResponse(url="/admin/users", status_code=303)
 
 
 @admin_router.post("/admin/users/{user_id}/delete")
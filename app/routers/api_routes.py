@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from cache import feed_cache
+from crud.crud_api import read_comment_items, read_post_item, read_post_items, read_profile_item
+from schemas import ApiComment, ApiPage, ApiPost, ApiPostSummary, ApiProfile
+from typing import Optional
+
+api_router = APIRouter(prefix="/api/v1", tags=["API"])
+
+post_page_adapter = TypeAdapter(ApiPage[ApiPostSummary])
+post_adapter = TypeAdapter(ApiPost)
+comment_page_adapter = TypeAdapter(ApiPage[ApiComment])
+profile_adapter = TypeAdapter(ApiProfile)
+
+
+def json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+async def post_page_json(
+        db: AsyncSession,
+        limit: int,
+        cursor: Optional[str],
+        user_id: Optional[int] = None) -> bytes:
+    # feed pages are cached already serialized, under the same generation as
+    # the HTML feed
+    key = ("api", user_id, cursor, limit)
+    generation = await feed_cache.current(db)
+    body = feed_cache.get(key, generation)
+    if body is None:
+        page = await read_post_items(db, limit=limit, cursor=cursor, user_id=user_id)
+        body = post_page_adapter.dump_json(page)
+        feed_cache.set(key, body, generation)
+    return body
+
+
+@api_router.get("/posts", response_model=ApiPage[ApiPostSummary])
+async def api_feed(
+        cursor: Optional[str] = None,
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_db)):
+    return json_response(await post_page_json(db, limit, cursor))
+
+
+@api_router.get("/posts/{post_id}", response_model=ApiPost)
+async def api_post(post_id: int, db: AsyncSession = Depends(get_db)):
+    post = await read_post_item(post_id, db)
+    return json_response(post_adapter.dump_json(post))
+
+
+@api_router.get("/posts/{post_id}/comments", response_model=ApiPage[ApiComment])
+async def api_post_comments(
+        post_id: int,
+        cursor: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=200),
+        db: AsyncSession = Depends(get_db)):
+    page = await read_comment_items(post_id, db, limit=limit, cursor=cursor)
+    return json_response(comment_page_adapter.dump_json(page))
+
+
+@api_router.get("/users/{user_id}", response_model=ApiProfile)
+async def api_profile(user_id: int, db: AsyncSession = Depends(get_db)):
+    profile = await read_profile_item(user_id, db)
+    return json_response(profile_adapter.dump_json(profile))
+
+
+@api_router.get("/users/{user_id}/posts", response_model=ApiPage[ApiPostSummary])
+async def api_user_posts(
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_db)):
+    return json_response(await post_page_json(db, limit, cursor, user_id=user_id))
@@ -1,14 +1,25 @@
-from fastapi import APIRouter, Depends, Request
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, Query, Request
 from database import get_db
 from crud.crud_post import read_posts
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from templating import stream_template
+from cache import feed_cache
+from conditional import is_not_modified, make_etag, not_modified_response, validator_headers
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 
 @router.get("/")
-async def root(request: Request, db: AsyncSession = Depends(get_db)):
-    posts = await read_posts(limit=100, offset=0, db=db)
-    return templates.TemplateResponse("home.html", {"request": request, "posts": posts})
+async def root(
+        request: Request,
+        cursor: Optional[str] = None,
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_db)):
+    generation = await feed_cache.current(db)
+    etag = make_etag("feed", generation, cursor, limit, request.session.get("user_id"))
+    headers = validator_headers(etag)
+    if is_not_modified(request, etag):
+        return not_modified_response(headers)
+    page = await read_posts(limit=limit, cursor=cursor, db=db, generation=generation)
+    return stream_template("home.html", {"request": request, "posts": page.items, "page": page}, headers=headers)
@@ -1,18 +1,19 @@
 from fastapi import APIRouter, Depends, Request, Form
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 from schemas import UserRead
 from database import get_db
-from auth import authenticate_user, get_current_user
+from auth import find_login_user, get_current_user, verify_login
+from crud.crud_user import read_user
+from templating import render_template
+from ratelimit import account_key, login_throttle
 
 auth_router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 
 @auth_router.get("/login")
 async def login_page(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    return await render_template("login.html", {"request": request})
 
 
 @auth_router.post("/login")
@@ -21,7 +22,13 @@ async def login(
         identifier: str = Form(...),
         password: str = Form(...),
         db: AsyncSession = Depends(get_db)):
-    authenticated_user = await authenticate_user(identifier, password, db)
+    login_throttle.check_client(request.client.host if request.client else "")
+    user = await find_login_user(identifier, db)
+    account = account_key(user.user_id if user else None, identifier)
+    login_throttle.check_account(account)
+    async with login_throttle.verification():
+        authenticated_user = await verify_login(user, password, db)
+    login_throttle.succeeded(account)
     request.session["user_id"] = authenticated_user.user_id
     return RedirectResponse(url="/", status_code=303)
 
@@ -29,13 +36,13 @@ async def login(
 @auth_router.get("/home")
 async def home(request: Request, db: AsyncSession = Depends(get_db)):
     user = await get_current_user(request, db)
-    return templates.TemplateResponse("home.html", {"request": request, "user": user})
+    return await render_template("home.html", {"request": request, "user": user})
 
 
 @auth_router.get("/me", response_model=UserRead)
 async def read_current_user(request: Request, db: AsyncSession = Depends(get_db)):
     user = await get_current_user(request, db)
-    return UserRead.model_validate(user)
+    return await read_user(user.user_id, db)
 
 
 @auth_router.post("/logout")
@@ -0,0 +1,16 @@
+import hmac
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from config import METRICS_TOKEN
+from metrics import CONTENT_TYPE, registry
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+            raise HTTPException(status_code=401, detail="Not authenticated")
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -1,26 +1,35 @@
-from fastapi import APIRouter, Depends, Request, Form, HTTPException, status
-from fastapi.templating import Jinja2Templates
+from fastapi import APIRouter, Depends, Query, Request, Form, HTTPException, status
 from starlette.status import HTTP_303_SEE_OTHER
 from fastapi.responses import RedirectResponse
-from schemas import PostCreate, PostUpdate
+from schemas import Page, PostCreate, PostSummary, PostUpdate, Principal
 from sqlalchemy.ext.asyncio import AsyncSession
-from database import get_db
-from crud.crud_post import create_post, update_post, get_post_by_id, delete_post
-from crud.crud_comment import get_comments_by_post
+from sqlalchemy.orm import sessionmaker
+from database import get_db, get_session_factory
+from crud.crud_post import create_post, update_post, get_post_by_id, get_post_version, get_rendered_post, delete_post, read_posts
+from crud.crud_comment import stream_comments_by_post
 from auth import get_current_user
-from models import User
+from typing import Optional
+from templating import render_template, stream_template
+from conditional import is_not_modified, make_etag, not_modified_response, validator_headers
 
 post_router = APIRouter(prefix="/posts")
 
-templates = Jinja2Templates(directory="templates")
-
 
 @post_router.get("/add-post")
 async def add_post_form(request: Request):
     user_id = request.session.get("user_id")
     if not user_id:
         return RedirectResponse(url="/login", status_code=HTTP_303_SEE_OTHER)
-    return templates.TemplateResponse("posts/add_post.html", {"request": request})
+    return await render_template("posts/add_post.html", {"request": request})
+
+
+@post_router.get("/", response_model=Page[PostSummary])
+async def list_posts(
+        cursor: Optional[str] = None,
+        limit: int = Query(20, ge=1, le=100),
+        user_id: Optional[int] = None,
+        db: AsyncSession = Depends(get_db)):
+    return await read_posts(limit=limit, cursor=cursor, user_id=user_id, db=db)
 
 
 @post_router.post("/", status_code=201)
@@ -42,12 +51,12 @@ async def edit_post_form(
         post_id: int,
         request: Request,
         db: AsyncSession = Depends(get_db)):
-    user: User = await get_current_user(request, db)
+    user: Principal = await get_current_user(request, db)
     post = await get_post_by_id(post_id, db)
     if post.user_id != user.user_id:
         raise HTTPException(
             status_code=403, detail="You do not have permission to edit this post")
-    return templates.TemplateResponse("posts/edit_post.html", {"request": request, "post": post})
+    return await render_template("posts/edit_post.html", {"request": request, "post": post})
 
 
 @post_router.post("/{post_id}/edit-post")
@@ -57,7 +66,7 @@ async def edit_post_submit(
         title: str = Form(...),
         content: str = Form(...),
         db: AsyncSession = Depends(get_db)):
-    user: User = await get_current_user(request, db)
+    user: Principal = await get_current_user(request, db)
     post = await get_post_by_id(post_id, db)
     if post.user_id != user.user_id:
         raise HTTPException(
@@ -68,22 +77,33 @@ async def edit_post_submit(
 
 
 @post_router.get("/{post_id}")
-async def read_post_detail(post_id: int, request: Request, db: AsyncSession = Depends(get_db)):
-    post = await get_post_by_id(post_id, db)
+async def read_post_detail(
+        post_id: int,
+        request: Request,
+        cursor: Optional[str] = None,
+        db: AsyncSession = Depends(get_db),
+        session_factory: sessionmaker = Depends(get_session_factory)):
+    user_id = request.session.get("user_id")
+    updated_at = await get_post_version(post_id, db)
+    etag = make_etag("post", post_id, updated_at, cursor, user_id)
+    headers = validator_headers(etag, updated_at)
+    if is_not_modified(request, etag, updated_at):
+        return not_modified_response(headers)
+    post = await get_rendered_post(post_id, db)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    comments = await get_comments_by_post(post_id, db)
-    return templates.TemplateResponse("posts/post_detail.html", {
+    comments = stream_comments_by_post(post_id, session_factory, cursor=cursor)
+    return stream_template("posts/post_detail.html", {
         "request": request,
         "post": post,
         "comments": comments,
-        "user_id": request.session.get("user_id")
-    })
+        "user_id": user_id
+    }, headers=headers)
 
 
 @post_router.get("/{post_id}/delete")
 async def render_post_delete(post_id: int, request: Request):
-    return templates.TemplateResponse("posts/post_delete.html", {
+    return await render_template("posts/post_delete.html", {
         "request": request,
         "post_id": post_id
     })
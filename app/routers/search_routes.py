@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db
+from crud.crud_post import search_posts
+from schemas import SearchPage
+from templating import render_template
+
+search_router = APIRouter(prefix="/search")
+
+
+@search_router.get("")
+async def search_page(
+        request: Request,
+        q: str = Query("", max_length=200),
+        page: int = Query(1, ge=1, le=50),
+        db: AsyncSession = Depends(get_db)):
+    results = await search_posts(q, db, page=page)
+    return await render_template("search.html", {"request": request, "results": results})
+
+
+@search_router.get("/results", response_model=SearchPage)
+async def search_results(
+        q: str = Query(..., max_length=200),
+        page: int = Query(1, ge=1, le=50),
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_db)):
+    return await search_posts(q, db, page=page, limit=limit)
@@ -1,23 +1,23 @@
 from fastapi import APIRouter, Depends, Query, HTTPException, Request, Form, UploadFile, File
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from models import User
 from schemas import UserCreate, UserRead, UserUpdate
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from database import get_db
-from crud.crud_user import create_user, read_user, read_users, update_user, delete_user, hash_password, verify_password
+from crud.crud_user import create_user, read_user, read_users, update_user, delete_user
+from security import hash_password, verify_password
+from sessions import current_session_id, session_backend
 from crud.crud_post import read_posts
-from typing import List, Optional
+from avatars import AvatarFiles, discard_avatar, save_avatar
+from typing import List, Optional, Tuple
 from models import GenderEnum
-import shutil
-import uuid
-import os
+from templating import render_template, stream_template
+from cache import feed_cache
+from conditional import is_not_modified, make_etag, not_modified_response, validator_headers
 
 
 user_router = APIRouter(prefix="/users", tags=["Users"])
-templates = Jinja2Templates(directory="templates")
-ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp"}
 
 
 def validate_gender(gender: str) -> GenderEnum:
@@ -27,28 +27,14 @@ def validate_gender(gender: str) -> GenderEnum:
         raise HTTPException(status_code=400, detail="Invalid gender selected")
 
 
-def handle_avatar_upload(avatar: Optional[UploadFile]) -> str:
-    if avatar is None or avatar.filename == "":
-        return None
-    if avatar.content_type not in ALLOWED_IMAGE_TYPES:
-        raise HTTPException(
-            status_code=400, detail="Only image files are allowed")
-    ext = os.path.splitext(avatar.filename)[-1]
-    filename = f"{uuid.uuid4().hex}{ext}"
-    file_path = f"static/avatars/{filename}"
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(avatar.file, buffer)
-    return f"/static/avatars/{filename}"
-
-
 async def process_user_form(
         username: str,
         gender: str,
         avatar_file: Optional[UploadFile],
         email: str,
-        password: Optional[str] = None) -> dict:
+        password: Optional[str] = None) -> Tuple[dict, AvatarFiles]:
     gender_enum = validate_gender(gender)
-    avatar_url = handle_avatar_upload(avatar_file)
+    avatar, avatar_files = await save_avatar(avatar_file)
     user_data = {
         "username": username,
         "gender": gender_enum,
@@ -56,14 +42,14 @@ async def process_user_form(
     }
     if password is not None:
         user_data["password"] = password
-    if avatar_url is not None:
-        user_data["avatar_url"] = avatar_url
-    return user_data
+    if avatar is not None:
+        user_data.update(avatar)
+    return user_data, avatar_files
 
 
 @user_router.get("/register")
 async def register_page(request: Request):
-    return templates.TemplateResponse("register.html", {"request": request})
+    return await render_template("register.html", {"request": request})
 
 
 @user_router.post("/register")
@@ -77,12 +63,15 @@ async def register_user(
         confirm_password: str = Form(...),
         db: AsyncSession = Depends(get_db),):
     if password != confirm_password:
-        return templates.TemplateResponse("register.html", {
+        return await render_template("register.html", {
             "request": request,
             "error": "Passwords do not match"})
-    user_data = await process_user_form(username, gender, avatar_url, email, password)
-    user_create = UserCreate(**user_data)
-    await create_user(user_create, db)
+    user_data, avatar_files = await process_user_form(username, gender, avatar_url, email, password)
+    try:
+        await create_user(UserCreate(**user_data), db, avatar_files)
+    except BaseException:
+        await discard_avatar(avatar_files)
+        raise
     result = await db.execute(select(User).where(User.email == email))
     user = result.scalar_one()
     request.session["user_id"] = user.user_id
@@ -98,12 +87,23 @@ async def get_users(
 
 
 @user_router.get("/{user_id}/show-profile", response_class=HTMLResponse)
-async def show_profile(user_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+async def show_profile(
+        user_id: int,
+        request: Request,
+        cursor: Optional[str] = None,
+        limit: int = Query(20, ge=1, le=100),
+        db: AsyncSession = Depends(get_db)):
+    generation = await feed_cache.current(db)
+    etag = make_etag("profile", generation, user_id,
+                     cursor, limit, request.session.get("user_id"))
+    headers = validator_headers(etag)
+    if is_not_modified(request, etag):
+        return not_modified_response(headers)
     user = await read_user(user_id, db)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    posts = await read_posts(user_id=user.user_id, limit=100, offset=0, db=db)
-    return templates.TemplateResponse("users/profile.html", {"request": request, "user": user, "posts": posts})
+    page = await read_posts(user_id=user.user_id, limit=limit, cursor=cursor, db=db, generation=generation)
+    return stream_template("users/profile.html", {"request": request, "user": user, "posts": page.items, "page": page}, headers=headers)
 
 
 @user_router.get("/me/edit-profile", response_class=HTMLResponse)
@@ -114,7 +114,7 @@ async def edit_profile(request: Request, db: AsyncSession = Depends(get_db)):
     user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return templates.TemplateResponse("users/edit_profile.html", {"request": request, "user": user})
+    return await render_template("users/edit_profile.html", {"request": request, "user": user})
 
 
 @user_router.post("/me/edit-profile")
@@ -128,15 +128,18 @@ async def update_profile(
     user_id = request.session.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    user_data = await process_user_form(username, gender, avatar_url, email)
-    user_update = UserUpdate(**user_data)
-    await update_user(user_id, user_update, db)
+    user_data, avatar_files = await process_user_form(username, gender, avatar_url, email)
+    try:
+        await update_user(user_id, UserUpdate(**user_data), db, avatar_files)
+    except BaseException:
+        await discard_avatar(avatar_files)
+        raise
     return RedirectResponse(url=f"/users/{user_id}/show-profile", status_code=303)
 
 
 @user_router.get("/me/delete-confirm")
 async def render_profile_delete(request: Request):
-    return templates.TemplateResponse("users/profile_delete.html", {"request": request})
+    return await render_template("users/profile_delete.html", {"request": request})
 
 
 @user_router.post("/me/edit-profile/delete", status_code=200)
@@ -154,7 +157,7 @@ async def change_password_page(request: Request):
     user_id = request.session.get("user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    return templates.TemplateResponse("users/change_password.html", {"request": request})
+    return await render_template("users/change_password.html", {"request": request})
 
 
 @user_router.post("/me/change-password")
@@ -172,20 +175,21 @@ async def change_password(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if not verify_password(current_password, user.hashed_password):
-        return templates.TemplateResponse("users/change_password.html", {
+    if not await verify_password(current_password, user.hashed_password):
+        return await render_template("users/change_password.html", {
             "request": request,
             "error": "Current password is incorrect"
         })
 
     if new_password != confirm_password:
-        return templates.TemplateResponse("users/change_password.html", {
+        return await render_template("users/change_password.html", {
             "request": request,
             "error": "New passwords do not match"
         })
 
-    user.hashed_password = hash_password(new_password)
+    user.hashed_password = await hash_password(new_password)
     await db.commit()
-    return templates.TemplateResponse("users/change_password.html", {
+    await session_backend.delete_user_sessions(user_id, keep=current_session_id(request))
+    return await render_template("users/change_password.html", {
         "request": request,
         "success": "Password updated successfully"})
@@ -1,8 +1,11 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Dict, Generic, List, Optional, TypeVar
+from typing_extensions import TypedDict
 from datetime import datetime
 from models import GenderEnum
 
+T = TypeVar("T")
+
 
 class FromORMBase(BaseModel):
     model_config = {
@@ -10,11 +13,15 @@ class FromORMBase(BaseModel):
     }
 
 
+AvatarVariants = Dict[str, Dict[str, str]]
+
+
 class UserBase(BaseModel):
     username: str
     email: EmailStr
     role: Optional[str] = "user"
     avatar_url: Optional[str] = None
+    avatar_variants: Optional[AvatarVariants] = None
     gender: GenderEnum
 
 
@@ -27,6 +34,7 @@ class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     password: Optional[str] = None
     avatar_url: Optional[str] = None
+    avatar_variants: Optional[AvatarVariants] = None
     gender: Optional[GenderEnum] = None
 
 
@@ -34,6 +42,32 @@ class UserRead(UserBase, FromORMBase):
     user_id: int
 
 
+# the author embedded in posts and comments anyone can read; email and role
+# stay in UserRead, which is for the account owner and admins
+class PublicAuthor(FromORMBase):
+    user_id: int
+    username: str
+    avatar_url: Optional[str] = None
+    avatar_variants: Optional[AvatarVariants] = None
+
+
+class Principal(FromORMBase):
+    user_id: int
+    username: str
+    role: Optional[str] = "user"
+    avatar_url: Optional[str] = None
+    avatar_variants: Optional[AvatarVariants] = None
+
+
+class AdminUserRow(FromORMBase):
+    user_id: int
+    username: str
+    email: str
+    role: Optional[str] = "user"
+    post_count: int
+    comment_count: int
+
+
 class UserAuth(BaseModel):
     email: EmailStr
     password: str
@@ -56,7 +90,24 @@ class PostUpdate(BaseModel):
 class PostRead(PostBase, FromORMBase):
     post_id: int
     created_at: datetime
-    user: UserRead
+    updated_at: Optional[datetime] = None
+    comment_count: int = 0
+    content_html: Optional[str] = None
+    word_count: int = 0
+    reading_time: int = 0
+    user: PublicAuthor
+
+
+class PostSummary(FromORMBase):
+    post_id: int
+    title: str
+    excerpt: str
+    word_count: int
+    reading_time: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    comment_count: int = 0
+    user: PublicAuthor
 
 
 class CommentBase(BaseModel):
@@ -74,5 +125,79 @@ class CommentUpdate(BaseModel):
 class CommentRead(CommentBase, FromORMBase):
     comment_id: int
     post_id: int
-    user: UserRead
+    user: PublicAuthor
     created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class PostSearchHit(BaseModel):
+    post_id: int
+    user_id: int
+    username: str
+    title_html: str
+    snippet_html: str
+    created_at: datetime
+    rank: float
+
+
+class SearchPage(BaseModel):
+    query: str
+    items: List[PostSearchHit]
+    page: int
+    next_page: Optional[int] = None
+    prev_page: Optional[int] = None
+
+
+# /api/v1 payloads: built as plain dicts straight from selected columns and
+# serialized without per-row model validation
+class ApiAuthor(TypedDict):
+    user_id: int
+    username: str
+    avatar_url: Optional[str]
+
+
+class ApiPostSummary(TypedDict):
+    post_id: int
+    title: str
+    excerpt: str
+    word_count: int
+    reading_time: int
+    created_at: datetime
+    updated_at: Optional[datetime]
+    comment_count: int
+    author: ApiAuthor
+
+
+class ApiPost(ApiPostSummary):
+    content: str
+    content_html: str
+
+
+class ApiComment(TypedDict):
+    comment_id: int
+    post_id: int
+    content: str
+    created_at: datetime
+    updated_at: Optional[datetime]
+    author: ApiAuthor
+
+
+class ApiProfile(TypedDict):
+    user_id: int
+    username: str
+    gender: GenderEnum
+    avatar_url: Optional[str]
+    avatar_variants: Optional[AvatarVariants]
+    post_count: int
+
+
+class ApiPage(TypedDict, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
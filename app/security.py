@@ -0,0 +1,51 @@
+import asyncio
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+from passlib.context import CryptContext
+from config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS
+
+# pinning min/max to the configured cost makes verify_and_update hand back
+# a fresh hash whenever BCRYPT_ROUNDS changes in either direction
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS)
+
+_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+
+async def _run(func: Callable, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, func, *args)
+
+
+async def hash_password(plain_password: str) -> str:
+    return await _run(pwd_context.hash, plain_password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run(pwd_context.verify, plain_password, hashed_password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+_dummy_hash: Optional[str] = None
+
+
+async def dummy_verify(plain_password: str) -> None:
+    # spends the same bcrypt time as a real check so unknown identifiers
+    # cannot be told apart from wrong passwords by response time
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await hash_password(secrets.token_urlsafe(16))
+    await verify_password(plain_password, _dummy_hash)
+
+
+def shutdown_executor() -> None:
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,224 @@
+import secrets
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from cache import LRUCache
+from config import SESSION_BACKEND, SESSION_CACHE_SIZE
+from database import AsyncSessionLocal
+from models import UserSession, utcnow
+
+SESSION_ID_BYTES = 24
+
+SessionRecord = Tuple[dict, datetime]
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(SESSION_ID_BYTES)
+
+
+class MemorySessionBackend:
+    def __init__(self, maxsize: int):
+        self._sessions = LRUCache(maxsize)
+
+    async def load(self, session_id: str) -> Optional[SessionRecord]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        data, _, expires_at = entry
+        if expires_at <= utcnow():
+            self._sessions.pop(session_id)
+            return None
+        return dict(data), expires_at
+
+    async def save(self, session_id: str, data: dict, expires_at: datetime) -> None:
+        self._sessions.set(session_id, (dict(data), data.get("user_id"), expires_at))
+
+    async def delete(self, session_id: str) -> None:
+        self._sessions.pop(session_id)
+
+    async def delete_user_sessions(self, user_id: int, keep: Optional[str] = None) -> int:
+        revoked = [session_id for session_id, (_, owner, _) in self._sessions.items()
+                   if owner == user_id and session_id != keep]
+        for session_id in revoked:
+            self._sessions.pop(session_id)
+        return len(revoked)
+
+    async def delete_users_sessions(self, user_ids: Iterable[int]) -> int:
+        user_ids = set(user_ids)
+        revoked = [session_id for session_id, (_, owner, _) in self._sessions.items()
+                   if owner in user_ids]
+        for session_id in revoked:
+            self._sessions.pop(session_id)
+        return len(revoked)
+
+    async def purge_expired(self) -> int:
+        now = utcnow()
+        expired = [session_id for session_id, (_, _, expires_at) in self._sessions.items()
+                   if expires_at <= now]
+        for session_id in expired:
+            self._sessions.pop(session_id)
+        return len(expired)
+
+
+class SqliteSessionBackend:
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+
+    async def load(self, session_id: str) -> Optional[SessionRecord]:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(UserSession.data, UserSession.expires_at)
+                .where(UserSession.session_id == session_id))
+            row = result.first()
+        if row is None or row.expires_at <= utcnow():
+            return None
+        return dict(row.data), row.expires_at
+
+    async def save(self, session_id: str, data: dict, expires_at: datetime) -> None:
+        values = {"data": data, "user_id": data.get("user_id"), "expires_at": expires_at}
+        async with self.session_factory() as db:
+            await db.execute(
+                insert(UserSession)
+                .values(session_id=session_id, **values)
+                .on_conflict_do_update(index_elements=[UserSession.session_id], set_=values))
+            await db.commit()
+
+    async def delete(self, session_id: str) -> None:
+        async with self.session_factory() as db:
+            await db.execute(delete(UserSession).where(UserSession.session_id == session_id))
+            await db.commit()
+
+    async def delete_user_sessions(self, user_id: int, keep: Optional[str] = None) -> int:
+        query = delete(UserSession).where(UserSession.user_id == user_id)
+        if keep is not None:
+            query = query.where(UserSession.session_id != keep)
+        async with self.session_factory() as db:
+            result = await db.execute(query)
+            await db.commit()
+        return result.rowcount
+
+    async def delete_users_sessions(self, user_ids: Iterable[int]) -> int:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                delete(UserSession).where(UserSession.user_id.in_(list(user_ids))))
+            await db.commit()
+        return result.rowcount
+
+    async def purge_expired(self) -> int:
+        async with self.session_factory() as db:
+            result = await db.execute(
+                delete(UserSession).where(UserSession.expires_at <= utcnow()))
+            await db.commit()
+        return result.rowcount
+
+
+def create_session_backend(name: str = SESSION_BACKEND):
+    if name == "memory":
+        return MemorySessionBackend(SESSION_CACHE_SIZE)
+    if name == "sqlite":
+        return SqliteSessionBackend()
+    raise ValueError(f"Unknown SESSION_BACKEND {name!r}")
+
+
+session_backend = create_session_backend()
+
+
+def current_session_id(connection: HTTPConnection) -> Optional[str]:
+    return connection.scope.get("session_id")
+
+
+class ServerSessionMiddleware:
+    """Keeps request.session in a server-side store keyed by an opaque cookie.
+
+    The store is only written when the session changed or is past half of its
+    lifetime, and a changed user_id always gets a fresh id.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            backend,
+            cookie_name: str = "session",
+            max_age: int = 14 * 24 * 3600,
+            https_only: bool = False,
+            purge_interval: float = 300,
+            exclude_paths: Iterable[str] = ()):
+        self.app = app
+        self.backend = backend
+        self.cookie_name = cookie_name
+        self.max_age = max_age
+        self.https_only = https_only
+        self.purge_interval = purge_interval
+        # paths that never read the session, so they cost no store lookup
+        self.exclude_paths = tuple(exclude_paths)
+        self._next_purge = time.monotonic() + purge_interval
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket") or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
+        cookie_id = HTTPConnection(scope).cookies.get(self.cookie_name)
+        record = await self.backend.load(cookie_id) if cookie_id else None
+        loaded_id = cookie_id if record is not None else None
+        loaded, expires_at = record if record is not None else ({}, None)
+        scope["session"] = dict(loaded)
+        scope["session_id"] = loaded_id
+
+        async def send_with_session(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                cookie = await self._commit(scope, cookie_id, loaded_id, loaded, expires_at)
+                if cookie is not None:
+                    MutableHeaders(scope=message).append("set-cookie", cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_with_session)
+        await self._purge_if_due()
+
+    async def _commit(
+            self,
+            scope: Scope,
+            cookie_id: Optional[str],
+            loaded_id: Optional[str],
+            loaded: dict,
+            expires_at: Optional[datetime]) -> Optional[str]:
+        session = scope["session"]
+        if not session:
+            if loaded_id is not None:
+                await self.backend.delete(loaded_id)
+            # also drops cookies for sessions that expired or were revoked
+            return self._cookie("", max_age=0) if cookie_id else None
+
+        now = utcnow()
+        session_id = loaded_id
+        if session_id is not None and session.get("user_id") != loaded.get("user_id"):
+            # logging in or switching user never reuses an id that existed before
+            await self.backend.delete(session_id)
+            session_id = None
+        if session_id is None:
+            session_id = new_session_id()
+        elif session == loaded and expires_at - now > timedelta(seconds=self.max_age / 2):
+            return None
+
+        await self.backend.save(session_id, session, now + timedelta(seconds=self.max_age))
+        scope["session_id"] = session_id
+        return self._cookie(session_id, max_age=self.max_age)
+
+    def _cookie(self, value: str, max_age: int) -> str:
+        cookie = f"{self.cookie_name}={value}; Path=/; Max-Age={max_age}; HttpOnly; SameSite=lax"
+        if self.https_only:
+            cookie += "; Secure"
+        return cookie
+
+    async def _purge_if_due(self) -> None:
+        # expired sessions are dropped in one statement every purge_interval
+        # rather than one by one on every request
+        if time.monotonic() < self._next_purge:
+            return
+        self._next_purge = time.monotonic() + self.purge_interval
+        await self.backend.purge_expired()
@@ -0,0 +1,102 @@
+import json
+import mimetypes
+import os
+import re
+from typing import Optional
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+STATIC_DIR = "static"
+STATIC_URL = "/static"
+MANIFEST_PATH = os.path.join(STATIC_DIR, "dist", "manifest.json")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+# build_static output (name.<hash>.ext) and content-hashed or uuid avatars
+_FINGERPRINT = re.compile(r"(?:^|[.\-])([0-9a-f]{12,64})(?:[.\-]|$)")
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    try:
+        with open(path, encoding="utf-8") as manifest:
+            data = json.load(manifest)
+    except FileNotFoundError:
+        data = {}
+    return {
+        "assets": data.get("assets", {}),
+        "etags": data.get("etags", {}),
+        "encodings": data.get("encodings", {}),
+    }
+
+
+_manifest = load_manifest()
+
+
+def static_url(path: str) -> str:
+    path = path.lstrip("/")
+    return f"{STATIC_URL}/{_manifest['assets'].get(path, path)}"
+
+
+def fingerprint(path: str) -> Optional[str]:
+    match = _FINGERPRINT.search(os.path.basename(path))
+    return match.group(1) if match else None
+
+
+def accepted_encodings(headers: Headers) -> set:
+    accepted = set()
+    for item in headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.partition(";")
+        name, _, value = params.partition("=")
+        try:
+            if name.strip() == "q" and float(value) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CachedStaticFiles(StaticFiles):
+    def __init__(self, *args, manifest: Optional[dict] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest if manifest is not None else _manifest
+
+    def file_response(
+            self,
+            full_path,
+            stat_result: os.stat_result,
+            scope: Scope,
+            status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+        digest = self.manifest["etags"].get(relative) or fingerprint(relative)
+
+        encoding = None
+        available = self.manifest["encodings"].get(relative, [])
+        if available:
+            accepted = accepted_encodings(request_headers)
+            encoding = next((e for e in ("br", "gzip") if e in available and e in accepted), None)
+
+        headers = {"cache-control": IMMUTABLE_CACHE_CONTROL if fingerprint(relative) else REVALIDATE_CACHE_CONTROL}
+        if available:
+            headers["vary"] = "Accept-Encoding"
+        if encoding is not None:
+            suffix = ".br" if encoding == "br" else ".gz"
+            headers["content-encoding"] = encoding
+            media_type = mimetypes.guess_type(relative)[0] or "application/octet-stream"
+            response = FileResponse(
+                f"{full_path}{suffix}", status_code=status_code,
+                headers=headers, media_type=media_type)
+        else:
+            response = FileResponse(
+                full_path, status_code=status_code, headers=headers, stat_result=stat_result)
+
+        if digest is not None:
+            # content hashes make strong validators; each encoding is its own representation
+            response.headers["etag"] = f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,87 @@
+import os
+import time
+from typing import Optional
+import jinja2
+from fastapi.responses import HTMLResponse, StreamingResponse
+from config import TEMPLATE_AUTO_RELOAD, TEMPLATE_CACHE_DIR, TEMPLATE_STREAM_CHUNK_SIZE
+from metrics import template_render
+from static_files import static_url
+
+TEMPLATE_DIR = "templates"
+HEAD_END = "</head>"
+
+
+def create_environment() -> jinja2.Environment:
+    if TEMPLATE_CACHE_DIR:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    environment = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATE_DIR),
+        autoescape=True,
+        auto_reload=TEMPLATE_AUTO_RELOAD,
+        # templates render with await, so async iterables can be looped over
+        # and sync render() must not be used
+        enable_async=True,
+        # compiled templates survive restarts; entries are keyed by source
+        # checksum only, so async bytecode gets its own file names
+        bytecode_cache=jinja2.FileSystemBytecodeCache(
+            TEMPLATE_CACHE_DIR or None, pattern="__jinja2_async_%s.cache"))
+    environment.globals["static_url"] = static_url
+    return environment
+
+
+# the one environment every router renders with
+environment = create_environment()
+
+
+def warm_up() -> int:
+    # compile every page at startup instead of on the first request for it
+    names = environment.list_templates(filter_func=lambda name: name.endswith(".html"))
+    for name in names:
+        environment.get_template(name)
+    return len(names)
+
+
+async def render_template(
+        name: str,
+        context: dict,
+        status_code: int = 200,
+        headers: Optional[dict] = None) -> HTMLResponse:
+    started = time.perf_counter()
+    content = await environment.get_template(name).render_async(context)
+    template_render.observe(time.perf_counter() - started, name)
+    return HTMLResponse(content, status_code=status_code, headers=headers)
+
+
+def stream_template(
+        name: str,
+        context: dict,
+        status_code: int = 200,
+        headers: Optional[dict] = None) -> StreamingResponse:
+    # sends everything up to </head> as soon as it is rendered so the browser
+    # can start fetching assets, then flushes in chunks while the body renders
+    template = environment.get_template(name)
+
+    async def body():
+        buffer = []
+        size = 0
+        head_sent = False
+        rendering = 0.0
+        started = time.perf_counter()
+        async for chunk in template.generate_async(context):
+            # time spent handing chunks to a slow client isn't rendering
+            rendering += time.perf_counter() - started
+            buffer.append(chunk)
+            size += len(chunk)
+            end_of_head = not head_sent and HEAD_END in chunk
+            if end_of_head or size >= TEMPLATE_STREAM_CHUNK_SIZE:
+                head_sent = head_sent or end_of_head
+                yield "".join(buffer)
+                buffer.clear()
+                size = 0
+            started = time.perf_counter()
+        template_render.observe(rendering, name)
+        if buffer:
+            yield "".join(buffer)
+
+    return StreamingResponse(
+        body(), status_code=status_code, headers=headers, media_type="text/html")
@@ -0,0 +1,239 @@
+"""Export users, posts and comments as NDJSON, or import such a file.
+
+Each line is {"table": ..., "row": {...}} with every column, ids and
+timestamps included, so an import reproduces the exported rows exactly.
+Files ending in .zst are zstd-compressed (needs the zstandard package).
+Export reads through a server-side cursor and import inserts in batches,
+so memory stays flat however many rows there are. Sessions are not
+exported, and accounts waiting for their purge are left out.
+
+Import only writes into an empty database at the current schema revision.
+Secondary indexes and the search triggers are dropped while rows are
+loaded and rebuilt once at the end; foreign keys are checked and comment
+counts recomputed then too. If the load fails, the indexes and triggers
+are restored but the rows committed so far stay: delete the target file
+and import again.
+
+    python transfer.py export backup.ndjson.zst
+    DB_AUTO_UPGRADE=1 python transfer.py import backup.ndjson.zst
+"""
+import argparse
+import asyncio
+import enum
+import io
+import json
+import time
+from datetime import datetime
+from typing import IO, Iterator
+from sqlalchemy import DateTime, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+from database import engine
+from init_db import check_schema
+from models import POST_FTS_DDL, Comment, Post, User
+
+TABLES = (User.__table__, Post.__table__, Comment.__table__)
+FTS_TRIGGERS = ("post_fts_ai", "post_fts_ad", "post_fts_au")
+
+
+def open_text(path: str, mode: str) -> IO[str]:
+    if not path.endswith(".zst"):
+        return open(path, mode, encoding="utf-8", newline="\n")
+    try:
+        import zstandard
+    except ImportError:
+        raise SystemExit("zstd files need the zstandard package: pip install zstandard")
+    raw = open(path, mode + "b")
+    if mode == "w":
+        stream = zstandard.ZstdCompressor(level=3, threads=-1).stream_writer(raw, closefd=True)
+    else:
+        stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    return io.TextIOWrapper(stream, encoding="utf-8", newline="\n")
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"cannot export {type(value).__name__}")
+
+
+class Progress:
+    def __init__(self, verb: str, every: int):
+        self.verb = verb
+        self.every = every
+        self.rows = 0
+        self.reported = 0
+        self.started = time.perf_counter()
+
+    def add(self, rows: int) -> None:
+        before = self.rows
+        self.rows += rows
+        if self.rows // self.every > before // self.every:
+            self.report()
+
+    def finish(self) -> None:
+        if self.reported != self.rows:
+            self.report()
+
+    def report(self) -> None:
+        self.reported = self.rows
+        elapsed = time.perf_counter() - self.started
+        print(f"{self.rows} rows {self.verb} ({self.rows / max(elapsed, 1e-9):.0f}/s)")
+
+
+def export_queries(has_deleted: bool) -> Iterator:
+    users, posts, comments = TABLES
+    queries = [select(users), select(posts), select(comments)]
+    if has_deleted:
+        live = select(users.c.user_id).where(users.c.deleted_at.is_(None))
+        queries[0] = queries[0].where(users.c.deleted_at.is_(None))
+        queries[1] = queries[1].where(posts.c.user_id.in_(live))
+        queries[2] = queries[2].where(
+            comments.c.user_id.in_(live),
+            comments.c.post_id.in_(select(posts.c.post_id).where(posts.c.user_id.in_(live))))
+    for table, query in zip(TABLES, queries):
+        yield table, query.order_by(*table.primary_key.columns)
+
+
+async def export_data(engine: AsyncEngine, path: str, batch_size: int = 5000, progress_every: int = 100_000) -> int:
+    progress = Progress("exported", progress_every)
+    dumps = json.JSONEncoder(default=_encode, ensure_ascii=False, separators=(",", ":")).encode
+    with open_text(path, "w") as out:
+        async with engine.connect() as connection:
+            has_deleted = await connection.scalar(
+                select(literal(1)).where(User.__table__.c.deleted_at.is_not(None)).limit(1))
+            for table, query in export_queries(bool(has_deleted)):
+                result = await connection.stream(query)
+                async for rows in result.mappings().partitions(batch_size):
+                    out.write("".join(
+                        dumps({"table": table.name, "row": dict(row)}) + "\n" for row in rows))
+                    progress.add(len(rows))
+    progress.finish()
+    return progress.rows
+
+
+async def _assert_empty(connection) -> None:
+    for table in TABLES:
+        if await connection.scalar(select(literal(1)).select_from(table).limit(1)):
+            raise SystemExit(f"table {table.name} is not empty; import needs an empty database")
+
+
+async def _drop_deferred(connection) -> list:
+    indexes = [index for table in TABLES for index in table.indexes if not index.unique]
+    for index in indexes:
+        await connection.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+    for trigger in FTS_TRIGGERS:
+        await connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+    return indexes
+
+
+async def _rebuild_deferred(connection, indexes: list) -> None:
+    for index in indexes:
+        await connection.run_sync(lambda sync_connection: index.create(sync_connection, checkfirst=True))
+    # export leaves out comments by accounts awaiting their purge, so the
+    # stored counts can be higher than the imported rows
+    await connection.exec_driver_sql(
+        "UPDATE post SET comment_count = "
+        "(SELECT count(*) FROM comments WHERE comments.post_id = post.post_id)")
+    # one pass over the post table instead of a trigger firing per row
+    await connection.exec_driver_sql("INSERT INTO post_fts(post_fts) VALUES ('rebuild')")
+    for statement in POST_FTS_DDL[1:]:
+        await connection.exec_driver_sql(statement)
+
+
+async def import_data(engine: AsyncEngine, path: str, batch_size: int = 5000, commit_every: int = 200_000, progress_every: int = 100_000) -> int:
+    tables = {table.name: table for table in TABLES}
+    datetime_columns = {
+        table.name: [column.name for column in table.columns if isinstance(column.type, DateTime)]
+        for table in TABLES}
+    progress = Progress("imported", progress_every)
+    async with engine.connect() as connection:
+        await _assert_empty(connection)
+        # both pragmas only take effect outside a transaction, so they go first;
+        # a failed import is rerun into a fresh file, so durability can wait
+        await connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        await connection.exec_driver_sql("PRAGMA synchronous=OFF")
+        indexes = await _drop_deferred(connection)
+        await connection.commit()
+
+        async def flush(name: str, batch: list) -> None:
+            await connection.execute(insert(tables[name]), batch)
+            progress.add(len(batch))
+
+        try:
+            uncommitted = 0
+            current, batch = None, []
+            with open_text(path, "r") as source:
+                for line in source:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    name, row = record["table"], record["row"]
+                    if name not in tables:
+                        raise SystemExit(f"unknown table {name!r} in {path}")
+                    if name != current or len(batch) >= batch_size:
+                        if batch:
+                            await flush(current, batch)
+                            uncommitted += len(batch)
+                        current, batch = name, []
+                        # short transactions keep the WAL from growing with the file
+                        if uncommitted >= commit_every:
+                            await connection.commit()
+                            uncommitted = 0
+                    for column in datetime_columns[name]:
+                        if row.get(column) is not None:
+                            row[column] = datetime.fromisoformat(row[column])
+                    batch.append(row)
+            if batch:
+                await flush(current, batch)
+            await connection.commit()
+        except BaseException:
+            # put the indexes and triggers back so the failed target is not
+            # silently missing them; the rows committed so far stay
+            await connection.rollback()
+            await _rebuild_deferred(connection, indexes)
+            await connection.commit()
+            raise
+
+        print("rebuilding indexes and the search index")
+        await _rebuild_deferred(connection, indexes)
+        await connection.commit()
+        violations = (await connection.exec_driver_sql("PRAGMA foreign_key_check")).all()
+        await connection.exec_driver_sql("PRAGMA optimize")
+        await connection.commit()
+        await connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+        await connection.exec_driver_sql("PRAGMA synchronous=NORMAL")
+    progress.finish()
+    if violations:
+        raise SystemExit(f"{len(violations)} rows reference missing users or posts, first: {violations[0]}")
+    return progress.rows
+
+
+async def run(args) -> int:
+    try:
+        if args.command == "export":
+            return await export_data(engine, args.path, args.batch_size, args.progress_every)
+        await check_schema()
+        return await import_data(
+            engine, args.path, args.batch_size, args.commit_every, args.progress_every)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path", help="NDJSON file; a .zst suffix means zstd-compressed")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--commit-every", type=int, default=200_000,
+                        help="rows per import transaction")
+    parser.add_argument("--progress-every", type=int, default=100_000)
+    args = parser.parse_args()
+    rows = asyncio.run(run(args))
+    print(f"done: {rows} rows {args.command}ed")
+
+
+if __name__ == "__main__":
+    main()
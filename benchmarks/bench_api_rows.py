@@ -0,0 +1,93 @@
+"""Compare feed serialization throughput: ORM + PostRead vs /api/v1 projection.
+
+Walks the whole feed page by page through both paths and reports rows/sec,
+including JSON encoding, with the feed cache bypassed.
+
+    python benchmarks/bench_api_rows.py --posts 50000 --limit 100
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from common import create_database, prepare_app_imports
+
+prepare_app_imports()
+
+from cache import feed_cache  # noqa: E402
+from crud.crud_api import read_post_items  # noqa: E402
+from crud.crud_post import read_posts  # noqa: E402
+from routers.api_routes import post_page_adapter  # noqa: E402
+
+
+def post_time(i: int) -> str:
+    return (datetime(2026, 1, 1) + timedelta(seconds=i, microseconds=i)).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def seed(path: Path, posts: int, users: int) -> None:
+    rng = random.Random(1234)
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO user (user_id, username, email, hashed_password, role, gender) "
+        "VALUES (?, ?, ?, 'x', 'user', 'male')",
+        [(i, f"user{i}", f"user{i}@example.com") for i in range(1, users + 1)])
+    connection.executemany(
+        "INSERT INTO post (user_id, title, content, created_at, updated_at, comment_count) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [(rng.randint(1, users), f"post {i}", "lorem ipsum " * rng.randint(20, 200),
+          post_time(i), post_time(i), rng.randint(0, 30))
+         for i in range(posts)])
+    connection.commit()
+    connection.close()
+
+
+async def walk_orm(db, limit: int) -> int:
+    rows, cursor = 0, None
+    while True:
+        feed_cache.clear()
+        page = await read_posts(db, limit=limit, cursor=cursor)
+        page.model_dump_json()
+        rows += len(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return rows
+
+
+async def walk_projection(db, limit: int) -> int:
+    rows, cursor = 0, None
+    while True:
+        page = await read_post_items(db, limit=limit, cursor=cursor)
+        post_page_adapter.dump_json(page)
+        rows += len(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return rows
+
+
+async def main(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "api.db"
+        engine, session_factory = await create_database(f"sqlite+aiosqlite:///{path}")
+        seed(path, args.posts, args.users)
+        for name, walk in (("orm + PostRead", walk_orm), ("api/v1 projection", walk_projection)):
+            best = None
+            for _ in range(args.repeat):
+                async with session_factory() as db:
+                    started = time.perf_counter()
+                    rows = await walk(db, args.limit)
+                    elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"{name:>18}: {rows} rows in {best:.2f}s  {rows / best:,.0f} rows/s")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=50_000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
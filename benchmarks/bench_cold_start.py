@@ -0,0 +1,66 @@
+"""Measure worker cold start: importing the app and running lifespan startup.
+
+Compares the schema version check with the previous startup, which built a
+second echoing engine and ran create_all on every boot.
+
+    python benchmarks/bench_cold_start.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from common import APP_DIR, ROOT
+
+PROBE = r"""
+import asyncio, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def startup():
+    if sys.argv[1] == "create_all":
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from config import DATABASE_URL
+        from models import Base
+        legacy = create_async_engine(DATABASE_URL, echo=True)
+        async with legacy.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        await legacy.dispose()
+    else:
+        from init_db import check_schema
+        await check_schema()
+
+asyncio.run(startup())
+print(imported - started, time.perf_counter() - imported)
+"""
+
+
+def run(mode: str, env: dict) -> tuple:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, mode], cwd=APP_DIR, env=env,
+        check=True, capture_output=True, text=True).stdout
+    imported, startup = output.splitlines()[-1].split()
+    return float(imported), float(startup)
+
+
+def main(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SECRET_KEY="benchmark", PYTHONPATH=str(APP_DIR),
+                   DATABASE_URL=f"sqlite+aiosqlite:///{Path(tmp) / 'cold.db'}")
+        subprocess.run([sys.executable, str(APP_DIR / "init_db.py")], cwd=ROOT, env=env,
+                       check=True, capture_output=True)
+        for mode in ("create_all", "check_schema"):
+            samples = [run(mode, env) for _ in range(args.runs)]
+            imported = statistics.median(s[0] for s in samples) * 1000
+            startup = statistics.median(s[1] for s in samples) * 1000
+            print(f"{mode:>12}: import {imported:7.1f} ms  startup {startup:7.1f} ms  "
+                  f"total {imported + startup:7.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    main(parser.parse_args())
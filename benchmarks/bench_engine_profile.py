@@ -0,0 +1,88 @@
+"""Compare the tuned SQLite engine profile with plain create_async_engine defaults
+under a concurrent read/write load.
+
+    python benchmarks/bench_engine_profile.py --readers 16 --writers 4 --seconds 10
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from common import prepare_app_imports, summarize
+
+prepare_app_imports()
+
+from sqlalchemy import insert, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+from database import create_engine  # noqa: E402
+from models import Base, GenderEnum, Post, User  # noqa: E402
+
+
+async def prepare(engine, posts: int) -> None:
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(insert(User).values(
+            user_id=1, username="bench", email="bench@example.com",
+            hashed_password="x", gender=GenderEnum.male))
+        await connection.execute(insert(Post), [
+            {"user_id": 1, "title": f"Post {i}", "content": "lorem ipsum " * 40}
+            for i in range(posts)])
+
+
+async def reader(engine, deadline: float, samples: list, errors: list) -> None:
+    query = select(Post.post_id, Post.title).order_by(
+        Post.created_at.desc(), Post.post_id.desc()).limit(20)
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            async with engine.connect() as connection:
+                (await connection.execute(query)).all()
+        except OperationalError as exc:
+            errors.append(exc)
+            continue
+        samples.append(time.perf_counter() - started)
+
+
+async def writer(engine, deadline: float, samples: list, errors: list) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            async with engine.begin() as connection:
+                await connection.execute(insert(Post).values(
+                    user_id=1, title="write", content="lorem ipsum " * 40))
+        except OperationalError as exc:
+            errors.append(exc)
+            continue
+        samples.append(time.perf_counter() - started)
+
+
+async def run_profile(label: str, engine, args) -> None:
+    await prepare(engine, args.posts)
+    reads, writes, errors = [], [], []
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(
+        *(reader(engine, deadline, reads, errors) for _ in range(args.readers)),
+        *(writer(engine, deadline, writes, errors) for _ in range(args.writers)))
+    await engine.dispose()
+    read_stats, write_stats = summarize(reads), summarize(writes)
+    print(f"{label:>8}: reads {len(reads) / args.seconds:8.1f}/s p99 {read_stats['p99_ms']:7.2f} ms | "
+          f"writes {len(writes) / args.seconds:7.1f}/s p99 {write_stats['p99_ms']:7.2f} ms | "
+          f"errors {len(errors)}")
+
+
+async def main(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = create_async_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'baseline.db'}")
+        await run_profile("defaults", baseline, args)
+        tuned = create_engine(f"sqlite+aiosqlite:///{Path(tmp) / 'tuned.db'}", echo=False)
+        await run_profile("tuned", tuned, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--posts", type=int, default=10_000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,188 @@
+"""In-process load benchmark for the main pages, login and comment writes.
+
+Seeds a database with seed_data.py (or reuses one with --db), then drives
+the ASGI app through httpx at the given concurrency, one scenario at a
+time, and reports p50/p95/p99 latency and requests/sec per scenario.
+Results can be saved as a JSON baseline and compared with a later run:
+
+    python benchmarks/bench_load.py --save benchmarks/baselines/before.json
+    python benchmarks/bench_load.py --compare benchmarks/baselines/before.json
+
+Reads pick post and profile ids with the same skew the generator uses for
+authors, so caches see a realistic hit rate. Login and comment requests
+go through the real bcrypt and write paths; the login rate limits are
+lifted for the run so they measure the work, not the throttle.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from common import ROOT, override_db, prepare_app_imports, summarize
+
+INVOKED_FROM = Path.cwd()
+for name in ("LOGIN_IP_BURST", "LOGIN_ACCOUNT_ATTEMPTS", "LOGIN_MAX_PENDING"):
+    os.environ.setdefault(name, "1000000")
+prepare_app_imports()
+
+import httpx  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from database import create_engine  # noqa: E402
+from main import app  # noqa: E402
+from seed_data import PASSWORD, generate, zipf_weights  # noqa: E402
+
+SCENARIOS = ("home", "post", "profile", "login", "comment")
+
+
+class Workload:
+    def __init__(self, users: int, posts: int, seed: int):
+        self.rng = random.Random(seed)
+        self.users = list(range(1, users + 1))
+        self.posts = list(range(1, posts + 1))
+        self.rng.shuffle(self.users)
+        self.rng.shuffle(self.posts)
+        self.user_weights = zipf_weights(users, 1.1)
+        self.post_weights = zipf_weights(posts, 0.8)
+
+    def user_id(self) -> int:
+        return self.rng.choices(self.users, cum_weights=self.user_weights)[0]
+
+    def post_id(self) -> int:
+        return self.rng.choices(self.posts, cum_weights=self.post_weights)[0]
+
+    def request(self, scenario: str) -> tuple:
+        if scenario == "home":
+            return "GET", "/", None
+        if scenario == "post":
+            return "GET", f"/posts/{self.post_id()}", None
+        if scenario == "profile":
+            return "GET", f"/users/{self.user_id()}/show-profile", None
+        if scenario == "login":
+            return "POST", "/login", {"identifier": f"user{self.user_id()}", "password": PASSWORD}
+        return "POST", f"/posts/{self.post_id()}/comments", {"content": "benchmark comment"}
+
+
+async def logged_in_client(user_id: int) -> httpx.AsyncClient:
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+    response = await client.post(
+        "/login", data={"identifier": f"user{user_id}", "password": PASSWORD})
+    if response.status_code != 303:
+        raise RuntimeError(f"login as user{user_id} failed with {response.status_code}")
+    return client
+
+
+async def run_scenario(scenario: str, workload: Workload, concurrency: int, requests: int) -> dict:
+    # each worker is its own browser: comment writers are logged in as different users
+    clients = [await logged_in_client(user_id) for user_id in range(1, concurrency + 1)]
+    samples, errors = [], {}
+    remaining = requests
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            method, url, data = workload.request(scenario)
+            started = time.perf_counter()
+            response = await client.request(method, url, data=data)
+            samples.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors[response.status_code] = errors.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(client) for client in clients))
+    elapsed = time.perf_counter() - started
+    for client in clients:
+        await client.aclose()
+    return {
+        **summarize(samples),
+        "rps": len(samples) / elapsed,
+        "errors": {str(status): count for status, count in sorted(errors.items())},
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_results(results: dict, baseline: dict = None) -> None:
+    print(f"{'scenario':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}  errors")
+    for scenario, stats in results.items():
+        line = (f"{scenario:>10} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+                f"{stats['p99_ms']:>9.2f} {stats['rps']:>9.1f}  {stats['errors'] or ''}")
+        print(line)
+        before = (baseline or {}).get(scenario)
+        if before:
+            deltas = "  ".join(
+                f"{key} {(stats[key] - before[key]) / before[key] * 100:+.1f}%"
+                for key in ("p50_ms", "p95_ms", "p99_ms", "rps") if before[key])
+            print(f"{'':>10} vs baseline: {deltas}")
+
+
+async def main(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            # work on a copy so comment writes don't accumulate between runs
+            path = Path(tmp) / "bench.db"
+            shutil.copyfile(INVOKED_FROM / args.db, path)
+        else:
+            path = Path(tmp) / "bench.db"
+            await generate(path, args.users, args.posts, args.comments, seed=args.seed)
+        engine = create_engine(f"sqlite+aiosqlite:///{path}")
+        override_db(app, sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession))
+        workload = Workload(args.users, args.posts, args.seed)
+
+        results = {}
+        for scenario in args.scenarios:
+            await run_scenario(scenario, workload, args.concurrency, args.warmup)
+            results[scenario] = await run_scenario(
+                scenario, workload, args.concurrency, args.requests)
+        await engine.dispose()
+
+    baseline = None
+    if args.compare:
+        baseline = json.loads((INVOKED_FROM / args.compare).read_text())["results"]
+    print_results(results, baseline)
+    if args.save:
+        target = INVOKED_FROM / args.save
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(json.dumps({
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "settings": {key: value for key, value in vars(args).items()
+                         if key not in ("save", "compare")},
+            "results": results,
+        }, indent=2) + "\n")
+        print(f"saved {target}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--comments", type=int, default=25000)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--db", help="reuse a database made by seed_data.py with the same sizes")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=500, help="per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="per scenario, not measured")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="print the change against this saved JSON file")
+    asyncio.run(main(parser.parse_args()))
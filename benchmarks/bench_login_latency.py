@@ -0,0 +1,80 @@
+"""Measure `/` latency while bcrypt logins run concurrently.
+
+    python benchmarks/bench_login_latency.py --logins 8 --requests 1000
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from common import create_database, override_db, prepare_app_imports, summarize
+
+prepare_app_imports()
+
+import httpx  # noqa: E402
+from main import app  # noqa: E402
+from models import GenderEnum, Post, User  # noqa: E402
+from security import hash_password  # noqa: E402
+
+
+async def seed(session_factory, posts: int) -> None:
+    async with session_factory() as db:
+        user = User(username="bench", email="bench@example.com", gender=GenderEnum.male,
+                    hashed_password=await hash_password("secret"))
+        db.add(user)
+        await db.flush()
+        db.add_all([Post(user_id=user.user_id, title=f"Post {i}", content="lorem ipsum " * 40)
+                    for i in range(posts)])
+        await db.commit()
+
+
+async def measure_home(client: httpx.AsyncClient, requests: int) -> list:
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get("/")
+        samples.append(time.perf_counter() - started)
+        response.raise_for_status()
+    return samples
+
+
+async def login_loop(client: httpx.AsyncClient, stop: asyncio.Event) -> int:
+    count = 0
+    while not stop.is_set():
+        await client.post("/login", data={"identifier": "bench", "password": "secret"})
+        count += 1
+    return count
+
+
+async def main(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, session_factory = await create_database(
+            f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}")
+        override_db(app, session_factory)
+        await seed(session_factory, args.posts)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await measure_home(client, 20)
+            idle = await measure_home(client, args.requests)
+
+            stop = asyncio.Event()
+            logins = [asyncio.create_task(login_loop(client, stop)) for _ in range(args.logins)]
+            started = time.perf_counter()
+            loaded = await measure_home(client, args.requests)
+            elapsed = time.perf_counter() - started
+            stop.set()
+            completed = sum(await asyncio.gather(*logins))
+        await engine.dispose()
+
+    for label, samples in (("idle", idle), (f"{args.logins} concurrent logins", loaded)):
+        stats = summarize(samples)
+        print(f"{label:>24}: p50 {stats['p50_ms']:.2f} ms  p99 {stats['p99_ms']:.2f} ms")
+    print(f"{'logins completed':>24}: {completed} ({completed / elapsed:.1f}/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
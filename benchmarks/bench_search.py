@@ -0,0 +1,81 @@
+"""Time FTS5 post search against a large synthetic table.
+
+    python benchmarks/bench_search.py --posts 1000000
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from common import create_database, prepare_app_imports, summarize
+
+prepare_app_imports()
+
+from crud.crud_post import build_match_expression, search_posts  # noqa: E402
+
+WORDS = [f"w{i:04d}" for i in range(5000)] + [
+    "fastapi", "sqlite", "python", "async", "jinja", "cursor", "index", "cache"]
+QUERIES = ["fastapi", "sqlite index", "python async cursor", "w0042", "cach", "jinja w1234"]
+
+
+def seed(path: Path, posts: int, batch: int = 50_000) -> float:
+    rng = random.Random(1234)
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=OFF")
+    connection.execute(
+        "INSERT INTO user (user_id, username, email, hashed_password, role, gender) "
+        "VALUES (1, 'bench', 'bench@example.com', 'x', 'user', 'male')")
+    started = time.perf_counter()
+    for offset in range(0, posts, batch):
+        rows = [
+            (1, " ".join(rng.choices(WORDS, k=6)),
+             " ".join(rng.choices(WORDS, k=rng.randint(40, 400))),
+             "2026-01-01 00:00:00.000000")
+            for _ in range(min(batch, posts - offset))
+        ]
+        connection.executemany(
+            "INSERT INTO post (user_id, title, content, created_at) VALUES (?, ?, ?, ?)", rows)
+        connection.commit()
+    connection.close()
+    return time.perf_counter() - started
+
+
+def explain(path: Path, query: str) -> list:
+    connection = sqlite3.connect(path)
+    plan = connection.execute(
+        "EXPLAIN QUERY PLAN SELECT post.post_id FROM post_fts "
+        "JOIN post ON post.post_id = post_fts.rowid "
+        "WHERE post_fts MATCH ? ORDER BY bm25(post_fts) LIMIT 21",
+        (build_match_expression(query),)).fetchall()
+    connection.close()
+    return [row[-1] for row in plan]
+
+
+async def main(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "search.db"
+        engine, session_factory = await create_database(f"sqlite+aiosqlite:///{path}")
+        print(f"seeded {args.posts} posts in {seed(path, args.posts):.1f}s")
+        print("plan:", "; ".join(explain(path, QUERIES[0])))
+
+        async with session_factory() as db:
+            for query in QUERIES:
+                samples = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    page = await search_posts(query, db, page=1)
+                    samples.append(time.perf_counter() - started)
+                stats = summarize(samples)
+                print(f"{query!r:>24}: {len(page.items):>2} hits  "
+                      f"p50 {stats['p50_ms']:.1f} ms  p99 {stats['p99_ms']:.1f} ms")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
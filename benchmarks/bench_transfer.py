@@ -0,0 +1,103 @@
+"""Measure transfer.py export and import throughput.
+
+Seeds a database with users, posts and comments, exports it to NDJSON
+(zstd with --zstd), imports the file into an empty database and reports
+rows/sec for both directions plus the file size, then checks that row
+counts and full-text search survived the round trip.
+
+    python benchmarks/bench_transfer.py --posts 200000 --comments 1000000 --zstd
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from common import create_database, prepare_app_imports
+
+prepare_app_imports()
+
+from sqlalchemy import func, select, text  # noqa: E402
+from transfer import TABLES, export_data, import_data  # noqa: E402
+
+
+def post_time(i: int) -> str:
+    # one microsecond apart, so keyset order is the insert order
+    return (datetime(2026, 1, 1) + timedelta(microseconds=i)).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def seed(path: Path, users: int, posts: int, comments: int) -> None:
+    rng = random.Random(1234)
+    words = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do".split()
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO user (user_id, username, email, hashed_password, role, gender) "
+        "VALUES (?, ?, ?, 'x', 'user', 'male')",
+        [(i, f"user{i}", f"user{i}@example.com") for i in range(1, users + 1)])
+    connection.executemany(
+        "INSERT INTO post (user_id, title, content, created_at, updated_at, comment_count) "
+        "VALUES (?, ?, ?, ?, ?, 0)",
+        ((rng.randint(1, users), f"post {i} {rng.choice(words)}",
+          " ".join(rng.choices(words, k=rng.randint(40, 400))),
+          post_time(i), post_time(i))
+         for i in range(posts)))
+    connection.executemany(
+        "INSERT INTO comments (post_id, user_id, content, created_at, updated_at) "
+        "VALUES (?, ?, ?, '2026-01-02 00:00:00', '2026-01-02 00:00:00')",
+        ((rng.randint(1, posts), rng.randint(1, users), " ".join(rng.choices(words, k=12)))
+         for _ in range(comments)))
+    connection.commit()
+    connection.close()
+
+
+async def count_rows(engine) -> dict:
+    async with engine.connect() as connection:
+        counts = {table.name: await connection.scalar(select(func.count()).select_from(table))
+                  for table in TABLES}
+        counts["post_fts"] = await connection.scalar(text(
+            "SELECT count(*) FROM post_fts WHERE post_fts MATCH 'lorem'"))
+    return counts
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--comments", type=int, default=250000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--zstd", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_path, target_path = Path(tmp) / "source.db", Path(tmp) / "target.db"
+        dump = str(Path(tmp) / ("dump.ndjson.zst" if args.zstd else "dump.ndjson"))
+        source, _ = await create_database(f"sqlite+aiosqlite:///{source_path}")
+        target, _ = await create_database(f"sqlite+aiosqlite:///{target_path}")
+        await source.dispose()
+        seed(source_path, args.users, args.posts, args.comments)
+        expected = await count_rows(source)
+        total = sum(expected[table.name] for table in TABLES)
+        progress_every = max(total, 1)
+
+        started = time.perf_counter()
+        await export_data(source, dump, args.batch_size, progress_every)
+        exported = time.perf_counter() - started
+        started = time.perf_counter()
+        await import_data(target, dump, args.batch_size, progress_every=progress_every)
+        imported = time.perf_counter() - started
+
+        actual = await count_rows(target)
+        print(f"rows:   {total} ({expected})")
+        print(f"file:   {os.path.getsize(dump) / 1e6:.1f} MB")
+        print(f"export: {exported:.2f}s ({total / exported:.0f} rows/s)")
+        print(f"import: {imported:.2f}s ({total / imported:.0f} rows/s)")
+        print("round trip ok" if actual == expected else f"MISMATCH: {actual}")
+        await source.dispose()
+        await target.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
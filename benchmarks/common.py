@@ -0,0 +1,58 @@
+import os
+import statistics
+import sys
+from pathlib import Path
+from typing import Iterable
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_DIR = ROOT / "app"
+
+
+def prepare_app_imports() -> None:
+    # the app imports its modules as top-level names and resolves
+    # templates/static relative to the working directory
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.chdir(APP_DIR)
+    if str(APP_DIR) not in sys.path:
+        sys.path.insert(0, str(APP_DIR))
+
+
+async def create_database(database_url: str, **options):
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import sessionmaker
+    from database import create_engine
+    from models import Base
+
+    engine = create_engine(database_url, **options)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    return engine, sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+
+def override_db(app, session_factory) -> None:
+    from database import get_db, get_session_factory
+
+    async def _get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = _get_db
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+
+
+def percentile(samples: Iterable[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: list) -> dict:
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": (statistics.fmean(samples) if samples else 0.0) * 1000,
+    }
@@ -0,0 +1,198 @@
+"""Generate a reproducible blog database for benchmarks.
+
+Sizes follow the shapes a real blog has rather than uniform noise: post
+and comment lengths are log-normal, a few prolific users write most of
+the posts and comments, and a few popular posts collect most of the
+comments. Words are drawn from a Zipf-weighted vocabulary so full-text
+search sees realistic term frequencies. Posts are stored already
+rendered, so reads never pay for lazy re-rendering. Every account's
+password is PASSWORD. The same --seed always produces the same database.
+
+    python benchmarks/seed_data.py /tmp/blog.db --users 10000 --posts 100000 --comments 1000000
+"""
+import argparse
+import asyncio
+import math
+import random
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import accumulate
+from pathlib import Path
+from common import create_database, prepare_app_imports
+
+# paths on the command line are relative to where the script was started
+INVOKED_FROM = Path.cwd()
+prepare_app_imports()
+
+from rendering import render_post  # noqa: E402
+from security import hash_password  # noqa: E402
+
+PASSWORD = "benchmark-password"
+SYLLABLES = ("ka", "lo", "ri", "ten", "mu", "sa", "vel", "dor", "ne", "pi", "quo", "ra",
+             "sti", "ban", "el", "to", "mir", "ga", "ul", "fen")
+BATCH_SIZE = 5000
+
+
+def zipf_weights(count: int, exponent: float) -> list:
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def lognormal_int(rng: random.Random, median: float, sigma: float, low: int, high: int) -> int:
+    return min(high, max(low, round(rng.lognormvariate(math.log(median), sigma))))
+
+
+class TextGenerator:
+    def __init__(self, rng: random.Random, vocabulary: int = 3000):
+        words = set()
+        while len(words) < vocabulary:
+            words.add("".join(rng.choices(SYLLABLES, k=rng.randint(1, 4))))
+        self.words = sorted(words, key=lambda word: (len(word), word))
+        self.cum_weights = zipf_weights(vocabulary, 1.0)
+        self.rng = rng
+
+    def words_of(self, count: int) -> list:
+        return self.rng.choices(self.words, cum_weights=self.cum_weights, k=count)
+
+    def sentence(self, count: int) -> str:
+        return " ".join(self.words_of(count)).capitalize()
+
+    def post(self, words: int) -> str:
+        # markdown with headings, lists and emphasis so rendering does real work
+        blocks = []
+        while words > 0:
+            size = min(words, self.rng.randint(40, 140))
+            words -= size
+            roll = self.rng.random()
+            if roll < 0.1:
+                blocks.append("## " + self.sentence(self.rng.randint(2, 6)))
+            if roll < 0.2:
+                items = self.words_of(size)
+                blocks.append("\n".join(
+                    "- " + " ".join(items[i:i + 10]) for i in range(0, len(items), 10)))
+                continue
+            text = self.words_of(size)
+            emphasis = self.rng.randrange(size)
+            text[emphasis] = f"**{text[emphasis]}**"
+            blocks.append(" ".join(text).capitalize() + ".")
+        return "\n\n".join(blocks)
+
+
+def _timestamp(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def _insert_posts(connection, executor, rows: list) -> None:
+    rendered = executor.map(render_post, [row[2] for row in rows], chunksize=64)
+    connection.executemany(
+        "INSERT INTO post (post_id, user_id, title, content, content_html, render_version, "
+        "excerpt, word_count, reading_time, created_at, updated_at, comment_count) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(post_id, user_id, title, content, derived["content_html"], derived["render_version"],
+          derived["excerpt"], derived["word_count"], derived["reading_time"],
+          created_at, created_at, comment_count)
+         for (post_id, user_id, content, title, created_at, comment_count), derived
+         in zip(rows, rendered)])
+
+
+async def generate(
+        path: Path,
+        users: int,
+        posts: int,
+        comments: int,
+        seed: int = 1234,
+        days: int = 365,
+        workers: int = None) -> dict:
+    engine, _ = await create_database(f"sqlite+aiosqlite:///{path}")
+    await engine.dispose()
+    hashed_password = await hash_password(PASSWORD)
+    rng = random.Random(seed)
+    text = TextGenerator(rng)
+    started = datetime(2026, 1, 1) - timedelta(days=days)
+    span = timedelta(days=days).total_seconds()
+
+    # prolific users and popular posts are spread over the id space
+    author_rank = list(range(1, users + 1))
+    rng.shuffle(author_rank)
+    author_weights = zipf_weights(users, 1.1)
+    post_rank = list(range(1, posts + 1))
+    rng.shuffle(post_rank)
+    popularity = zipf_weights(posts, 0.8)
+
+    # comments are placed first so comment_count is known when posts are written
+    comment_posts = rng.choices(post_rank, cum_weights=popularity, k=comments) if posts else []
+    comment_counts = [0] * (posts + 1)
+    for post_id in comment_posts:
+        comment_counts[post_id] += 1
+    post_times = sorted(rng.random() * span for _ in range(posts))
+
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO user (user_id, username, email, hashed_password, role, avatar_url, gender) "
+        "VALUES (?, ?, ?, ?, 'user', '/static/avatars/default.png', ?)",
+        [(i, f"user{i}", f"user{i}@example.com", hashed_password,
+          rng.choice(("male", "female"))) for i in range(1, users + 1)])
+    connection.commit()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        batch = []
+        for post_id in range(1, posts + 1):
+            batch.append((
+                post_id,
+                rng.choices(author_rank, cum_weights=author_weights)[0],
+                text.post(lognormal_int(rng, 350, 0.8, 20, 5000)),
+                text.sentence(rng.randint(3, 10)),
+                _timestamp(started + timedelta(seconds=post_times[post_id - 1])),
+                comment_counts[post_id]))
+            if len(batch) == BATCH_SIZE:
+                _insert_posts(connection, executor, batch)
+                connection.commit()
+                batch = []
+        if batch:
+            _insert_posts(connection, executor, batch)
+            connection.commit()
+
+    for offset in range(0, comments, BATCH_SIZE):
+        rows = []
+        for post_id in comment_posts[offset:offset + BATCH_SIZE]:
+            posted = post_times[post_id - 1]
+            created_at = started + timedelta(seconds=posted + rng.random() * (span - posted))
+            rows.append((
+                post_id,
+                rng.choices(author_rank, cum_weights=author_weights)[0],
+                text.sentence(lognormal_int(rng, 20, 0.9, 1, 400)),
+                _timestamp(created_at),
+                _timestamp(created_at)))
+        connection.executemany(
+            "INSERT INTO comments (post_id, user_id, content, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)", rows)
+        connection.commit()
+    connection.execute("ANALYZE")
+    connection.close()
+    return {"users": users, "posts": posts, "comments": comments, "seed": seed}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", type=Path, help="SQLite file to create")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    path = INVOKED_FROM / args.path
+    if path.exists():
+        parser.error(f"{path} already exists")
+    started = time.perf_counter()
+    counts = await generate(
+        path, args.users, args.posts, args.comments,
+        seed=args.seed, days=args.days, workers=args.workers)
+    print(f"generated {counts} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,12 @@
+import os
+import sys
+from pathlib import Path
+
+# the app imports its modules as top-level names, like benchmarks/common.py
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("PURGE_CHUNK_SIZE", "2")
+os.environ.setdefault("PURGE_PAUSE", "0.05")
+os.chdir(APP_DIR)
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
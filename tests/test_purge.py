@@ -0,0 +1,83 @@
+import asyncio
+from datetime import timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+# imported up front so a short test lease can't lapse while the purge worker imports it
+import crud.crud_user  # noqa: F401
+from database import create_engine
+from models import Base, Comment, Post, User, utcnow
+from purge import PurgeQueue
+
+
+async def _database(path):
+    engine = create_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    return engine, sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+
+async def _deleted_account(session_factory, comments: int, **lease) -> int:
+    async with session_factory() as db:
+        user = User(username="gone", email="gone@example.com", hashed_password="x",
+                    gender="male", avatar_url=None, deleted_at=utcnow(), **lease)
+        db.add(user)
+        await db.flush()
+        post = Post(user_id=user.user_id, title="t", content="c")
+        db.add(post)
+        await db.flush()
+        db.add_all(Comment(post_id=post.post_id, user_id=user.user_id, content="c")
+                   for _ in range(comments))
+        await db.commit()
+        return user.user_id
+
+
+async def _account(session_factory, user_id: int):
+    async with session_factory() as db:
+        result = await db.execute(
+            select(User.purge_owner, User.purge_lease).where(User.user_id == user_id))
+        return result.first()
+
+
+def test_restart_within_lease_is_retried(tmp_path):
+    async def scenario():
+        engine, session_factory = await _database(tmp_path / "purge.db")
+        # a previous process died holding the lease
+        user_id = await _deleted_account(
+            session_factory, 3, purge_owner="host:1:dead",
+            purge_lease=utcnow() + timedelta(seconds=1))
+        queue = PurgeQueue(session_factory)
+        await queue.resume()
+        await queue.join()
+        assert await _account(session_factory, user_id) is not None
+        assert user_id in queue._retries
+
+        await asyncio.sleep(2.5)
+        await queue.join()
+        assert await _account(session_factory, user_id) is None
+        await queue.stop()
+        await engine.dispose()
+
+    asyncio.run(scenario())
+
+
+def test_stop_releases_the_lease(tmp_path):
+    async def scenario():
+        engine, session_factory = await _database(tmp_path / "purge.db")
+        user_id = await _deleted_account(session_factory, 20)
+        queue = PurgeQueue(session_factory)
+        await queue.resume()
+        await asyncio.sleep(0.12)
+        await queue.stop()
+        account = await _account(session_factory, user_id)
+        assert account is not None
+        assert account.purge_owner is None and account.purge_lease is None
+
+        # the next process picks the account up straight away
+        queue = PurgeQueue(session_factory)
+        await queue.resume()
+        await queue.join()
+        assert await _account(session_factory, user_id) is None
+        await engine.dispose()
+
+    asyncio.run(scenario())